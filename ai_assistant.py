@@ -1,4 +1,3 @@
-import google.generativeai as genai
 from database import SecondBrainDB
 from datetime import datetime
 import json
@@ -11,9 +10,15 @@ import pytz
 from googletrans import Translator
 import os
 from dotenv import load_dotenv
-from functools import lru_cache
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
+from config import CONTEXT_RECENT_TURNS, CONTEXT_RESPONSE_MAX_CHARS, SPLIT_CACHE_TTL, METRICS_EXPORT_PATH
+from response_cache import ResponseCache, SemanticResponseCache, make_cache_key
+from llm_gateway import LLMGateway
+from intent_classifier import IntentClassifier, split_on_question_marks
+from metrics import metrics
+from model_backends import create_model
+from job_queue import JobQueue
 load_dotenv()
 
 # Gemini API Key and Model
@@ -22,14 +27,23 @@ GEMINI_MODEL = "gemini-1.5-flash"
 
 class SecondBrainAssistant:
     def __init__(self):
-        genai.configure(api_key=GEMINI_API_KEY)
-        self.model = genai.GenerativeModel(GEMINI_MODEL)
+        self.model = create_model(GEMINI_MODEL, api_key=GEMINI_API_KEY)  # Gemini, or the stub/record/replay backends
+        self.llm = LLMGateway(self.model)  # All model calls go through the gateway
         self.db = SecondBrainDB()
+        # Conversation saving and memory extraction survive restarts and are retried on failure
+        self.jobs = JobQueue(self.db, {
+            'save_conversation': self._save_conversation_job,
+            'extract_memory': self._extract_memory_job,
+        })
         self.conversation_history = []
         self.advanced_search_mode = True  # Default to advanced mode
         self.executor = ThreadPoolExecutor(max_workers=3)  # For parallel processing
-        self._response_cache = {}  # Simple response cache
-        self._cache_lock = threading.Lock()
+        self.response_cache = ResponseCache()  # Persistent LRU/TTL response cache
+        self.semantic_cache = SemanticResponseCache()  # Serves paraphrases of cached questions
+        self.intents = IntentClassifier()  # Local classification; the LLM is only asked when unsure
+        self.context_stats = {'last_bytes_saved': 0, 'total_bytes_saved': 0}
+        self._context_cache = None  # (db change version, context)
+        self._context_lock = threading.Lock()
         self.system_prompt = """You are a friendly and helpful assistant. Your main goal is to provide clear, complete answers in a natural, conversational way.\n\n**Core Instructions:**\n1.  **Simple and Clear:** Use easy-to-understand words. Avoid jargon or complex vocabulary.\n2.  **Full Sentences:** Always use grammatically correct, complete sentences. For example, instead of just "Paris," say, "The capital of France is Paris."\n3.  **Friendly Tone:** Be approachable and conversational, like a real person.\n4.  **Be Concise:** Keep your answers brief and to the point (usually 2-3 sentences).\n5.  **Directly Answer:** Always address the user's question directly.\n\n**Example:**\n*   **User:** what's the time and how are you\n*   **Good Response:** "I'm doing well, thanks for asking! The current time is 3:15 PM."\n*   **Bad Response:** "3:15 PM. I am an AI."\n\nYour primary goal is to be helpful, clear, and friendly."""
         self.greeting_responses = [
             "Hi, how are you today?",
@@ -45,29 +59,33 @@ class SecondBrainAssistant:
         ]
         self.last_greeting = None
     
-    def _get_cache_key(self, message, context=""):
-        """Generate a cache key for responses"""
-        return hash((message.lower().strip(), context))
+    def _get_cached_response(self, message, context="", namespace="conversation", site=None):
+        """Get cached response if available, recording the hit or miss against the call site"""
+        cached = self.response_cache.get(namespace, message.lower().strip(), context)
+        metrics.record_cache(site or namespace, 'hit' if cached else 'miss')
+        return cached
     
-    def _get_cached_response(self, message, context=""):
-        """Get cached response if available"""
-        cache_key = self._get_cache_key(message, context)
-        with self._cache_lock:
-            return self._response_cache.get(cache_key)
-    
-    def _cache_response(self, message, context, response):
+    def _cache_response(self, message, context, response, namespace="conversation", ttl=None):
         """Cache a response"""
-        cache_key = self._get_cache_key(message, context)
-        with self._cache_lock:
-            # Simple cache with max size of 100 entries
-            if len(self._response_cache) >= 100:
-                # Remove oldest entry
-                oldest_key = next(iter(self._response_cache))
-                del self._response_cache[oldest_key]
-            self._response_cache[cache_key] = response
-    
-    @lru_cache(maxsize=50)
+        self.response_cache.set(namespace, message.lower().strip(), context, value=response, ttl=ttl)
+    
+    def _context_fingerprint(self):
+        """Fingerprint of the personal context an answer may depend on (profile, not recent chatter)"""
+        return make_cache_key("profile", self.db.get_user_profile())
+    
     def get_context(self):
+        """Return the enriched context, rebuilding it only when the database has changed"""
+        with self._context_lock:
+            # Read the version before building so writes made meanwhile trigger a rebuild next time;
+            # it also changes when another process writes to the same database
+            version = self.db.change_version()
+            if self._context_cache and self._context_cache[0] == version:
+                return self._context_cache[1]
+            context = self._build_context()
+            self._context_cache = (version, context)
+            return context
+    
+    def _build_context(self):
         """Build enriched context from user profile, recent interactions and key memories"""
         context_parts = []
         
@@ -84,13 +102,28 @@ class SecondBrainAssistant:
             if user_profile.get('interests'):
                 context_parts.append(f"- Your interests: {user_profile['interests']}")
         
-        # Get recent conversations
-        recent_conversations = self.db.get_recent_conversations(5)
+        # Summary of older conversations folded away by the compactor
+        conversation_summary = self.db.get_conversation_summary()
+        if conversation_summary:
+            context_parts.append("\nEarlier conversations (summary):")
+            context_parts.append(conversation_summary)
+        
+        # Get the most recent turns, with long responses shortened
+        recent_conversations = self.db.get_recent_conversations(max(5, CONTEXT_RECENT_TURNS))
+        # What the last five full exchanges would have cost, for the bytes-saved report
+        unbounded_bytes = sum(len(f"You: {conv[0]}\nMe: {conv[1]}".encode('utf-8')) for conv in recent_conversations[:5])
+        bounded_bytes = len(conversation_summary.encode('utf-8'))
         if recent_conversations:
             context_parts.append("\nRecent conversations:")
-            for conv in recent_conversations:
+            for conv in recent_conversations[:CONTEXT_RECENT_TURNS]:
+                response = conv[1]
+                if len(response) > CONTEXT_RESPONSE_MAX_CHARS:
+                    response = response[:CONTEXT_RESPONSE_MAX_CHARS].rstrip() + '...'
                 context_parts.append(f"You: {conv[0]}")
-                context_parts.append(f"Me: {conv[1]}")
+                context_parts.append(f"Me: {response}")
+                bounded_bytes += len(f"You: {conv[0]}\nMe: {response}".encode('utf-8'))
+        self.context_stats['last_bytes_saved'] = unbounded_bytes - bounded_bytes
+        self.context_stats['total_bytes_saved'] += unbounded_bytes - bounded_bytes
         
         # Get important memories with more insight
         memories = self.db.get_memories(limit=5)
@@ -106,14 +139,24 @@ class SecondBrainAssistant:
         Uses the language model to split a user's message into distinct questions or statements.
         """
         # Check cache first
-        cached = self._get_cached_response(f"split:{user_message}")
+        cached = self._get_cached_response(user_message, namespace="split", site="split_into_questions")
         if cached:
             return cached
         
         # A simple heuristic to avoid an API call for very simple inputs
         if len(user_message.split()) < 7 and ' and ' not in user_message and '?' not in user_message[1:]:
             result = [user_message]
-            self._cache_response(f"split:{user_message}", "", result)
+            self._cache_response(user_message, "", result, namespace="split", ttl=SPLIT_CACHE_TTL)
+            return result
+        
+        # Only ask the model to split when the local classifier thinks there are several questions
+        # (or is unsure); "What is X? How does Y work?" is split locally
+        label, confidence, source = self.intents.classify('multi_question', user_message)
+        confident = label is not None and confidence >= self.intents.threshold
+        if confident and (label == 'single' or source == 'rule'):
+            self.intents.record('multi_question', source)
+            result = [user_message] if label == 'single' else split_on_question_marks(user_message)
+            self._cache_response(user_message, "", result, namespace="split", ttl=SPLIT_CACHE_TTL)
             return result
 
         prompt = f"""You are a text-processing utility. Your task is to analyze the following user message and split it into individual, self-contained questions or statements.
@@ -129,20 +172,24 @@ User Message:
 JSON Output:
 """
         try:
-            response = self.model.generate_content(prompt)
-            text = response.text if hasattr(response, 'text') else response.candidates[0].content.parts[0].text
+            text = self.llm.generate_sync(prompt, site="split_into_questions")
             json_str_match = re.search(r'\[.*\]', text, re.DOTALL)
             if json_str_match:
                 parsed_json = json.loads(json_str_match.group(0))
                 if isinstance(parsed_json, list) and all(isinstance(q, str) for q in parsed_json):
-                    self._cache_response(f"split:{user_message}", "", parsed_json)
+                    if confident:
+                        self.intents.record('multi_question', source)
+                    else:
+                        llm_label = 'multi' if len(parsed_json) > 1 else 'single'
+                        self.intents.record_fallback('multi_question', user_message, label, confidence, llm_label)
+                    self._cache_response(user_message, "", parsed_json, namespace="split", ttl=SPLIT_CACHE_TTL)
                     return parsed_json
             result = [user_message]
-            self._cache_response(f"split:{user_message}", "", result)
+            self._cache_response(user_message, "", result, namespace="split", ttl=SPLIT_CACHE_TTL)
             return result
         except Exception:
             result = [user_message]
-            self._cache_response(f"split:{user_message}", "", result)
+            self._cache_response(user_message, "", result, namespace="split", ttl=SPLIT_CACHE_TTL)
             return result
     
     def should_combine_responses(self, user_message, responses):
@@ -171,16 +218,16 @@ JSON Output:
         # For longer, complex queries with multiple distinct questions
         return False
     
-    def create_unified_response(self, user_message, questions):
-        """
-        Creates a single, cohesive response to multiple related questions or statements
-        instead of processing them separately.
-        """
-        # Build context for unified response
-        context = self.get_context()
-        
-        # Create a prompt that asks for a unified response to all parts of the message
-        unified_prompt = f"""Instructions: {self.system_prompt}
+    def _generate_stream(self, prompt, stream=True, site=None):
+        """Yield response text from the model, chunk by chunk when streaming or all at once otherwise"""
+        if not stream:
+            yield self.llm.generate_sync(prompt, site=site)
+            return
+        yield from self.llm.stream_sync(prompt, site=site)
+    
+    def _build_unified_prompt(self, user_message, context):
+        """Create a prompt that asks for a unified response to all parts of the message"""
+        return f"""Instructions: {self.system_prompt}
         
 Context: {context if context else 'None'}
         
@@ -188,16 +235,37 @@ User Message: {user_message}
         
 Please provide a single, cohesive response that addresses all parts of the user's message naturally. 
 Do not treat each part separately - instead, create one flowing, conversational response that feels human and natural."""
+    
+    def create_unified_response(self, user_message, questions):
+        """
+        Creates a single, cohesive response to multiple related questions or statements
+        instead of processing them separately.
+        """
+        return ''.join(self.stream_unified_response(user_message, questions, stream=False)).strip()
+    
+    def stream_unified_response(self, user_message, questions, stream=True):
+        """Streaming version of create_unified_response: yields the answer as it is generated"""
+        # Build context for unified response
+        context = self.get_context()
+        unified_prompt = self._build_unified_prompt(user_message, context)
         
+        started = False
         try:
-            response = self.model.generate_content(unified_prompt)
-            text = response.text if hasattr(response, 'text') else response.candidates[0].content.parts[0].text
-            return text.strip()
+            for chunk in self._generate_stream(unified_prompt, stream=stream, site="stream_unified_response"):
+                started = True
+                yield chunk
         except Exception as e:
-            return self.process_message(questions[0]) if questions else f"I'm having trouble processing that right now. Error: {str(e)}"
+            if started:
+                yield f"\n\nI'm having trouble processing that right now. Error: {str(e)}"
+            else:
+                yield self.process_message(questions[0]) if questions else f"I'm having trouble processing that right now. Error: {str(e)}"
     
     def handle_explain_command(self, user_message):
         """Handle /explain command: parse topic, optional marks, and format, then generate a detailed explanation."""
+        return ''.join(self.stream_explain_command(user_message, stream=False)).strip()
+    
+    def _build_explain_prompt(self, user_message):
+        """Parse topic, optional marks and format from an /explain command and build the prompt"""
         import re
         # Remove '/explain' prefix
         command = user_message[len('/explain'):].strip()
@@ -225,47 +293,75 @@ Do not treat each part separately - instead, create one flowing, conversational
         else:
             prompt += "Use a standard, well-structured format with headings, bullet points, and examples if relevant. "
         prompt += "Do not add unnecessary filler or repetition. Be as smart and concise as possible, but cover all key points in detail."
+        return prompt
+    
+    def stream_explain_command(self, user_message, stream=True):
+        """Streaming version of handle_explain_command: yields the explanation as it is generated"""
+        prompt = self._build_explain_prompt(user_message)
+        cached = self._get_cached_response(prompt, namespace="explain", site="stream_explain_command")
+        if cached:
+            yield cached
+            return
+        chunks = []
         try:
-            response = self.model.generate_content(prompt)
-            text = response.text if hasattr(response, 'text') else response.candidates[0].content.parts[0].text
-            return text.strip()
+            for chunk in self._generate_stream(prompt, stream=stream, site="stream_explain_command"):
+                chunks.append(chunk)
+                yield chunk
+            self._cache_response(prompt, "", ''.join(chunks).strip(), namespace="explain")
         except Exception as e:
-            return f"I'm having trouble generating the explanation right now. Error: {str(e)}"
+            error = f"I'm having trouble generating the explanation right now. Error: {str(e)}"
+            yield f"\n\n{error}" if chunks else error
 
-    def handle_report_command(self, user_message):
-        """Handle /report command: parse the request and generate a PDF report."""
-        from report_generator import PDFReportGenerator
+    def handle_report_command(self, user_message, progress=None):
+        """Handle /report command: parse the request and generate a PDF report (progress gets per-section updates)."""
+        from report_generator import PDFReportGenerator, split_report_command
         
         # Extract the actual request after /report
         request_content = user_message[len('/report'):].strip()
         
         # Provide immediate feedback about what we're doing
-        if not request_content:
+        if not split_report_command(user_message)[0]:
             return "Please specify what you'd like the report to be about. Example: /report on artificial intelligence"
         
         # Show what we understood from the request
         try:
             generator = PDFReportGenerator()
             
-            # Get a preview of what will be generated
-            preview_prompt = f"""
-            Analyze this report request and provide a brief summary of what the report will contain:
-            
-            Request: "{request_content}"
-            
-            Provide a 2-3 sentence summary of:
-            1. The main topic
-            2. Key sections that would be included
-            3. Type of report (biographical, technical, analysis, etc.)
-            
-            Be concise and informative.
-            """
-            
-            preview_response = self.model.generate_content(preview_prompt)
-            preview_text = preview_response.text if hasattr(preview_response, 'text') else preview_response.candidates[0].content.parts[0].text
+            # The planning call also writes the preview, so only ask separately if planning fell back
+            report_data = generator.parse_report_request(user_message, self)
+            preview_future = None
+            if not report_data.get('preview'):
+                # Get a preview of what will be generated
+                preview_prompt = f"""
+                Analyze this report request and provide a brief summary of what the report will contain:
+                
+                Request: "{request_content}"
+                
+                Provide a 2-3 sentence summary of:
+                1. The main topic
+                2. Key sections that would be included
+                3. Type of report (biographical, technical, analysis, etc.)
+                
+                Be concise and informative.
+                """
+                
+                # The preview does not depend on the report, so let it run while the report is generated
+                preview_future = self.llm.submit(preview_prompt, site="handle_report_command.preview")
             
             # Generate the actual report
-            file_path, title = generator.generate_report(user_message, self)
+            file_path, title = generator.generate_report(user_message, self, report_data=report_data, progress=progress)
+            preview_text = report_data.get('preview', '')
+            if preview_future is not None:
+                if not file_path:
+                    preview_future.cancel()
+                else:
+                    try:
+                        preview_text = preview_future.result()
+                    except Exception:
+                        # The report exists; a failed preview should not turn it into an error
+                        preview_text = ''
+            if not preview_text.strip():
+                preview_text = f"A report on {report_data.get('content') or title} covering {', '.join(report_data.get('sections', []))}."
             
             if file_path:
                 return f"\n📄 **Report Generated Successfully!**\n\n**Title:** {title}\n\n**Preview:** {preview_text.strip()}\n\n**File Location:** {file_path}\n\n✅ Your report is ready! You can find it in the reports folder."
@@ -281,8 +377,10 @@ Do not treat each part separately - instead, create one flowing, conversational
             query = user_message[len('/search'):].strip()
             if not query:
                 return "Please provide a search query after /search."
-            search_results = advanced_web_search(query, self.model, num_results=5)
-            provide_refs = self.should_provide_references(query)
+            # Classify in parallel with the search instead of after it
+            refs_future = self.executor.submit(self.should_provide_references, query)
+            search_results = advanced_web_search(query, self.llm, num_results=5)
+            provide_refs = refs_future.result()
             if search_results:
                 top = search_results[0]
                 main_answer = top.get('enriched_snippet') or top.get('snippet') or 'No summary available.'
@@ -322,9 +420,13 @@ Do not treat each part separately - instead, create one flowing, conversational
 
     def is_time_or_date_query(self, user_message):
         """
-        Uses the language model to determine if the user is asking for the current time or date.
-        Returns 'time', 'date', or 'none'.
+        Determines if the user is asking for the current time or date.
+        Returns 'time', 'date', or 'none'. The language model is only asked when the local classifier is unsure.
         """
+        return self.intents.decide('time_date', user_message, lambda: self._llm_time_or_date_query(user_message)) or 'none'
+
+    def _llm_time_or_date_query(self, user_message):
+        """Uses the language model to classify a message as 'time', 'date' or 'none'"""
         prompt = f"""You are a text classification assistant. Your task is to determine if the user's message is a direct request for the current time or date.
 Respond with only one of these three words: 'time', 'date', or 'none'. Do not add any other text or punctuation.
 
@@ -338,66 +440,134 @@ User Message:
 
 Classification:"""
 
-        try:
-            response = self.model.generate_content(prompt)
-            text = response.text if hasattr(response, 'text') else response.candidates[0].content.parts[0].text
-            result = text.strip().lower()
-            if result in ['time', 'date']:
-                return result
-            else:
-                return 'none'
-        except Exception:
+        text = self.llm.generate_sync(prompt, site="is_time_or_date_query")
+        result = text.strip().lower()
+        if result in ['time', 'date']:
+            return result
+        else:
             return 'none'
 
     def should_provide_references(self, user_message):
-        """Use LLM to decide if references should be provided for this query."""
+        """Decide if references should be provided for this query, asking the LLM only when the local classifier is unsure."""
+        return self.intents.decide('references', user_message, lambda: self._llm_should_provide_references(user_message)) == 'yes'
+
+    def _llm_should_provide_references(self, user_message):
+        """Use LLM to decide if references should be provided for this query ('yes' or 'no')."""
         prompt = (
             "You are an expert AI assistant. For the following user message, decide if it would be helpful or expected to provide references, sources, or links in the answer. "
             "Respond with only 'yes' or 'no'.\n\n"
             f"User Message: {user_message}\n\nClassification:"
         )
-        try:
-            response = self.model.generate_content(prompt)
-            text = response.text if hasattr(response, 'text') else response.candidates[0].content.parts[0].text
-            result = text.strip().lower()
-            return result == 'yes'
-        except Exception:
-            return False
+        text = self.llm.generate_sync(prompt, site="should_provide_references")
+        result = text.strip().lower()
+        return 'yes' if result == 'yes' else 'no'
 
+    def _build_conversation_prompt(self, user_message, context):
+        """Build the full conversation prompt from instructions, context and relevant memories"""
+        full_message = f"Instructions: {self.system_prompt}\n\n"
+        if context:
+            full_message += f"Context: {context}\n\n"
+        relevant_memories = self.db.semantic_search_memories(user_message, limit=3)
+        if relevant_memories:
+            full_message += "Relevant things you've told me:\n"
+            full_message += "\n".join(f"- {memory[1]}" for memory in relevant_memories)
+            full_message += "\n\n"
+        full_message += f"User: {user_message}"
+        return full_message
+    
     def _process_conversation_message(self, user_message, language_style='en'):
+        return ''.join(self.stream_conversation_message(user_message, language_style, stream=False)).strip()
+    
+    def stream_conversation_message(self, user_message, language_style='en', stream=True):
+        """Yield the answer to a conversational message as it is generated; caches and saves the full text at the end"""
         # Check cache first
         context = self.get_context()
-        cached_response = self._get_cached_response(user_message, context)
+        cached_response = self._get_cached_response(user_message, context, site="stream_conversation_message")
         if cached_response:
-            return cached_response
+            yield cached_response
+            return
+        fingerprint = self._context_fingerprint()
+        semantic_response, _ = self.semantic_cache.lookup(user_message, fingerprint)
+        metrics.record_cache("stream_conversation_message", 'semantic_hit' if semantic_response else 'semantic_miss')
+        if semantic_response:
+            yield semantic_response
+            return
         
         # Just answer using the model's own knowledge (never web search)
         task_type = self._classify_task(user_message)
-        full_message = f"Instructions: {self.system_prompt}\n\n"
-        if context:
-            full_message += f"Context: {context}\n\n"
-        full_message += f"User: {user_message}"
+        full_message = self._build_conversation_prompt(user_message, context)
         
+        chunks = []
         try:
-            response = self.model.generate_content(full_message)
-            text = response.text if hasattr(response, 'text') else response.candidates[0].content.parts[0].text
-            assistant_response = text.strip()
+            for chunk in self._generate_stream(full_message, stream=stream, site="stream_conversation_message"):
+                chunks.append(chunk)
+                yield chunk
+            assistant_response = ''.join(chunks).strip()
+            # Cache the response (errors are not cached so they are retried next time)
+            self._cache_response(user_message, context, assistant_response)
+            self.semantic_cache.store(user_message, fingerprint, assistant_response)
         except Exception as e:
-            assistant_response = f"I'm having trouble processing that right now. Error: {str(e)}"
-        
-        # Cache the response
-        self._cache_response(user_message, context, assistant_response)
+            error = f"I'm having trouble processing that right now. Error: {str(e)}"
+            assistant_response = f"{''.join(chunks).strip()}\n\n{error}" if chunks else error
+            yield f"\n\n{error}" if chunks else error
         
         # Save to database and extract memory asynchronously
-        self.executor.submit(self._save_conversation_async, user_message, assistant_response)
-        
-        return assistant_response
+        self._save_conversation_async(user_message, assistant_response)
+    
+    def stream_message(self, user_message, language_style='en', stream=True):
+        """Streaming counterpart of process_message: yields response text as it becomes available"""
+        lowered = user_message.strip().lower()
+        if lowered.startswith('/explain'):
+            yield from self.stream_explain_command(user_message, stream=stream)
+        elif lowered.startswith('/search') or lowered.startswith('/report') or lowered.startswith('memory'):
+            # Commands that assemble their answer from several steps are returned whole
+            yield self.process_message(user_message, language_style=language_style)
+        else:
+            yield from self.stream_conversation_message(user_message, language_style=language_style, stream=stream)
     
     def _save_conversation_async(self, user_message, assistant_response):
-        """Save conversation and extract memory asynchronously"""
-        self.db.save_conversation(user_message, assistant_response, None, None)
+        """Queue durable jobs that save the conversation and extract memory in the background"""
+        # Separate jobs so a failed extraction is retried without saving the conversation twice
+        # The turn's time is fixed now, so a retried or replayed save keeps its place in history
+        self.jobs.enqueue('save_conversation', {'user_message': user_message, 'assistant_response': assistant_response,
+                                                'timestamp': datetime.now().isoformat()})
+        self.jobs.enqueue('extract_memory', {'user_message': user_message, 'assistant_response': assistant_response})
+    
+    def _save_conversation_job(self, user_message, assistant_response, timestamp=None):
+        # The job queue acknowledges the job in the write-behind batch that stores this row
+        self.db.write_queue.put_conversation(user_message, assistant_response, None, None, timestamp=timestamp)
+    
+    def _extract_memory_job(self, user_message, assistant_response):
         self._extract_and_save_memory(user_message, assistant_response)
     
+    def get_stats(self):
+        """Per-call-site metrics plus the gateway, classifier, cache and database pool counters"""
+        return {
+            'calls': metrics.snapshot(),
+            'llm': self.llm.stats(),
+            'intents': self.intents.stats(),
+            'response_cache': self.response_cache.stats(),
+            'semantic_cache': self.semantic_cache.stats(),
+            'db_pool': self.db.pool_stats(),
+            'jobs': self.jobs.stats(),
+            'context': dict(self.context_stats),
+        }
+    
+    def shutdown(self):
+        """Finish background work and drain queued database writes"""
+        self.executor.shutdown(wait=True)
+        # Unfinished jobs stay in the jobs table and are replayed on the next start
+        self.jobs.close()
+        if METRICS_EXPORT_PATH:
+            try:
+                metrics.export(METRICS_EXPORT_PATH)
+            except Exception as e:
+                print(f"Could not export metrics: {str(e)}")
+        self.db.close()
+        self.response_cache.close()
+        self.semantic_cache.close()
+        self.llm.close()
+    
     def _classify_task(self, message):
         """Classify the type of task based on user message"""
         message_lower = message.lower()
@@ -436,13 +606,13 @@ Classification:"""
         memory_keywords = ['remember this', 'save this', 'important', 'note this', 'memorize', 'keep in mind']
         if any(phrase in user_lower for phrase in memory_keywords):
             # Save the user's message as memory with high importance
-            self.db.save_memory(user_message, "user_request", 3)
+            self.db.write_queue.put_memory(user_message, "user_request", 3)
             return
 
         # Check for preferences
         preference_keywords = ['i like', 'i prefer', 'i don\'t like', 'i hate', 'favorite', 'least favorite']
         if any(phrase in user_lower for phrase in preference_keywords):
-            self.db.save_memory(f"Preference: {user_message}", "preference", 2)
+            self.db.write_queue.put_memory(f"Preference: {user_message}", "preference", 2)
             return
 
         # Context-based special saves
@@ -450,7 +620,7 @@ Classification:"""
             # Extract key points from the explanation
             key_points = self._extract_key_points(assistant_response)
             if key_points:
-                self.db.save_memory(f"Explanation: {key_points}", "explanation", 1)
+                self.db.write_queue.put_memory(f"Explanation: {key_points}", "explanation", 1)
     
     def _extract_key_points(self, text):
         """Extract key points from a longer text"""
@@ -464,7 +634,13 @@ Classification:"""
     
     def search_memories(self, query):
         """Search through memories using database search"""
-        memories = self.db.search_memories(query, limit=5)
+        memories = list(self.db.search_memories(query, limit=5))
+        # Fill remaining slots with semantically similar memories
+        if len(memories) < 5:
+            seen_ids = {memory[0] for memory in memories}
+            for memory in self.db.semantic_search_memories(query, limit=5):
+                if memory[0] not in seen_ids and len(memories) < 5:
+                    memories.append(memory)
         if not memories:
             return f"No memories found matching '{query}'"
         
@@ -549,6 +725,8 @@ Classification:"""
     
     def _handle_memory_commands(self, user_message):
         """Handle memory-related commands"""
+        # Make memories queued by recent conversations visible to these commands
+        self.db.flush_writes()
         parts = user_message.lower().split()
         
         if len(parts) == 1:
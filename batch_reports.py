@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Batch PDF report generation for Second Brain Assistant
+Reads report requests from a file (one per line, '#' comments allowed, the
+/report prefix is optional) and generates them all. Planning, search and
+section writing for every report share one assistant, so model calls go
+through the same rate-limited LLM gateway; the CPU-bound ReportLab builds
+run in a process pool. Each finished report appends one line to a JSONL
+manifest with its output path, timings and any failures.
+
+    python batch_reports.py requests.txt --concurrency 4 --render-workers 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime
+
+
+def read_requests(path):
+    """Report requests from a file, normalised to '/report ...' commands"""
+    requests = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if not line.lower().startswith('/report'):
+                line = f"/report {line}"
+            requests.append(line)
+    return requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate PDF reports for every request in a file")
+    parser.add_argument("requests_file", help="file with one report request per line")
+    parser.add_argument("--concurrency", type=int, default=4, help="reports being planned and written at once")
+    parser.add_argument("--render-workers", type=int, default=os.cpu_count() or 1, help="processes building PDFs")
+    parser.add_argument("--output-dir", default=os.path.join(os.getcwd(), 'reports'), help="where PDFs are written")
+    parser.add_argument("--manifest", default=None, help="JSONL manifest path (default: <output-dir>/batch_manifest_<timestamp>.jsonl)")
+    parser.add_argument("--fresh", action="store_true", help="regenerate sections instead of reusing cached ones")
+    args = parser.parse_args()
+
+    requests = read_requests(args.requests_file)
+    if not requests:
+        print(f"No report requests in {args.requests_file}")
+        return
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest_path = args.manifest or os.path.join(
+        args.output_dir, f"batch_manifest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+    )
+
+    from ai_assistant import SecondBrainAssistant
+    from report_generator import PDFReportGenerator, render_report_pdf, split_report_command
+
+    assistant = SecondBrainAssistant()
+    generator = PDFReportGenerator()
+    manifest_lock = threading.Lock()
+    # Spawned rather than forked workers: the assistant already runs the gateway's event loop thread
+    render_pool = ProcessPoolExecutor(max_workers=max(1, args.render_workers),
+                                      mp_context=multiprocessing.get_context('spawn'))
+
+    def write_manifest(entry):
+        with manifest_lock:
+            with open(manifest_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def run_one(index, request):
+        started = time.monotonic()
+        entry = {'index': index, 'request': request, 'status': 'failed', 'title': None, 'path': None}
+        try:
+            if not split_report_command(request)[0]:
+                # The same check the /report command makes; the planner would invent a topic
+                raise ValueError("Report request has no topic")
+            # Plan, search and write sections here; only the PDF build goes to the process pool
+            pipeline = generator.build_pipeline(request, assistant, fresh=args.fresh)
+            report_data = pipeline.run(['sections'])['plan']
+            entry['title'] = report_data['title']
+            output_path = generator.report_output_path(report_data, args.output_dir, prefix=f"{index:03d}_")
+            entry['path'], render_seconds = render_pool.submit(render_report_pdf, report_data, output_path).result()
+            results = report_data['section_results']
+            entry.update({
+                'status': 'ok',
+                'sections': len(results),
+                'cached_sections': sum(1 for result in results if result.get('cached')),
+                'failed_sections': [result['section'] for result in results if result['status'] != 'ok'],
+                'stage_times': {**pipeline.timings, 'render': render_seconds},
+            })
+        except Exception as e:
+            entry['error'] = f"{type(e).__name__}: {str(e)}"
+        entry['seconds'] = round(time.monotonic() - started, 3)
+        write_manifest(entry)
+        print(f"[{index + 1}/{len(requests)}] {entry['status']:<6} {entry['seconds']:>7.1f}s  {entry['title'] or request}")
+        return entry
+
+    started = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+            entries = list(executor.map(run_one, range(len(requests)), requests))
+    finally:
+        render_pool.shutdown()
+        assistant.shutdown()
+
+    elapsed = time.monotonic() - started
+    succeeded = sum(1 for entry in entries if entry['status'] == 'ok')
+    print(f"{succeeded}/{len(entries)} reports in {elapsed:.1f}s ({len(entries) / elapsed * 60:.1f} reports/min)")
+    print(f"Manifest: {manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
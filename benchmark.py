@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Offline load test for Second Brain Assistant
+Runs a mix of chat, multi-question and /explain messages through the full
+assistant pipeline against the stub (or replay) model backend and prints
+throughput and per-call-site latency. No network access is needed.
+
+    python benchmark.py --messages 200 --concurrency 8 --latency "lognormal:-0.5,0.5"
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MESSAGES = [
+    "hello there, how are you doing today",
+    "what is the difference between a list and a tuple in python",
+    "remember that my favourite colour is green",
+    "what is photosynthesis and why is it important for plants",
+    "/explain recursion for 5 marks",
+    "can you give me some tips for better sleep",
+    "what is the capital of japan and what is its population",
+    "explain how a hash map works",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test against the stub model backend")
+    parser.add_argument("--messages", type=int, default=100, help="total messages to send")
+    parser.add_argument("--concurrency", type=int, default=4, help="messages in flight at once")
+    parser.add_argument("--backend", default="stub", choices=["stub", "replay"], help="model backend to use")
+    parser.add_argument("--latency", default=None, help="stub latency distribution, e.g. fixed:0.2 or normal:0.8,0.2")
+    parser.add_argument("--keep-data", action="store_true", help="use the configured databases instead of temporary ones")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so they must be in the environment before importing the app
+    os.environ["MODEL_BACKEND"] = args.backend
+    if args.latency:
+        os.environ["MODEL_STUB_LATENCY"] = args.latency
+    if not args.keep_data:
+        workdir = tempfile.mkdtemp(prefix="second_brain_bench_")
+        os.environ["DATABASE_PATH"] = os.path.join(workdir, "second_brain.db")
+        os.environ["RESPONSE_CACHE_PATH"] = os.path.join(workdir, "response_cache.db")
+        os.environ["INTENT_FALLBACK_LOG"] = os.path.join(workdir, "intent_fallbacks.jsonl")
+
+    from ai_assistant import SecondBrainAssistant
+    from metrics import metrics
+
+    assistant = SecondBrainAssistant()
+    messages = [f"{MESSAGES[i % len(MESSAGES)]} (#{i // len(MESSAGES)})" for i in range(args.messages)]
+    latencies = []
+
+    def send(message):
+        started = time.monotonic()
+        for question in assistant.split_into_questions(message):
+            assistant.process_message(question)
+        latencies.append(time.monotonic() - started)
+
+    started = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(send, messages))
+        elapsed = time.monotonic() - started
+    finally:
+        assistant.shutdown()
+
+    latencies.sort()
+    print(f"{len(messages)} messages in {elapsed:.2f}s ({len(messages) / elapsed:.1f} msg/s, concurrency {args.concurrency})")
+    print(f"end-to-end p50 {latencies[len(latencies) // 2]:.3f}s  p95 {latencies[int(len(latencies) * 0.95) - 1]:.3f}s  max {latencies[-1]:.3f}s")
+    print()
+    print(f"{'call site':<40}{'calls':>7}{'mean':>9}{'p50':>9}{'p95':>9}  cache")
+    for site, stats in metrics.snapshot().items():
+        latency = stats['latency']
+        cache = ', '.join(f"{outcome}={count}" for outcome, count in sorted(stats['cache'].items()))
+        print(f"{site:<40}{stats['calls']:>7}{latency['mean']:>9.3f}{latency['p50']:>9.3f}{latency['p95']:>9.3f}  {cache}")
+
+
+if __name__ == "__main__":
+    main()
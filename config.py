@@ -10,9 +10,95 @@ COHERE_API_KEY = os.getenv("COHERE_API_KEY")
 # Database Configuration
 DATABASE_PATH = os.getenv("DATABASE_PATH", "second_brain.db")
 
+# SQLite Storage Settings
+DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "WAL")
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", 5000))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", 256 * 1024 * 1024))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", 20000))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+DB_POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", 300))
+
 # Conversation Settings
 MAX_CONVERSATION_HISTORY = int(os.getenv("MAX_CONVERSATION_HISTORY", 50))
+CONVERSATION_COMPACTION_BATCH = int(os.getenv("CONVERSATION_COMPACTION_BATCH", 10))
+CONVERSATION_SUMMARY_MAX_CHARS = int(os.getenv("CONVERSATION_SUMMARY_MAX_CHARS", 2000))
+CONTEXT_RECENT_TURNS = int(os.getenv("CONTEXT_RECENT_TURNS", 3))
+CONTEXT_RESPONSE_MAX_CHARS = int(os.getenv("CONTEXT_RESPONSE_MAX_CHARS", 300))
 MAX_MEMORY_ENTRIES = int(os.getenv("MAX_MEMORY_ENTRIES", 1000))
+MEMORY_EVICTION_INTERVAL = float(os.getenv("MEMORY_EVICTION_INTERVAL", 60))
+MEMORY_EVICTION_BATCH = int(os.getenv("MEMORY_EVICTION_BATCH", 200))
+
+# Output Settings
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() in ("1", "true", "yes")
+
+# Multi-Question Settings
+SPLIT_QUESTION_WORKERS = int(os.getenv("SPLIT_QUESTION_WORKERS", 4))
+SPLIT_QUESTION_TIMEOUT = float(os.getenv("SPLIT_QUESTION_TIMEOUT", 60))
+
+# Report Settings
+REPORT_SECTION_WORKERS = int(os.getenv("REPORT_SECTION_WORKERS", 4))
+REPORT_SECTION_TIMEOUT = float(os.getenv("REPORT_SECTION_TIMEOUT", 90))
+REPORT_SECTION_RETRIES = int(os.getenv("REPORT_SECTION_RETRIES", 1))
+REPORT_SECTION_CACHE_TTL = int(os.getenv("REPORT_SECTION_CACHE_TTL", 7 * 24 * 60 * 60))
+# Lay out each section as soon as it is written instead of building the whole PDF at the end
+REPORT_PROGRESSIVE = os.getenv("REPORT_PROGRESSIVE", "true").lower() in ("1", "true", "yes")
+
+# Intent Classifier Settings
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_model.json"))
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", 0.85))
+INTENT_FALLBACK_LOG = os.getenv("INTENT_FALLBACK_LOG", "intent_fallbacks.jsonl")
+
+# Metrics Settings
+# When set, call metrics are written to <path>.json and <path>.prom on exit
+METRICS_EXPORT_PATH = os.getenv("METRICS_EXPORT_PATH", "")
 
 # Knowledge Base Settings
-KNOWLEDGE_FILE = os.getenv("KNOWLEDGE_FILE", "knowledge_base.json") 
+KNOWLEDGE_FILE = os.getenv("KNOWLEDGE_FILE", "knowledge_base.json")
+
+# Write-Behind Queue Settings
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", 100))
+WRITE_FLUSH_INTERVAL = float(os.getenv("WRITE_FLUSH_INTERVAL", 0.5))
+
+# Background Job Queue Settings
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_QUEUE_DEPTH = int(os.getenv("JOB_QUEUE_DEPTH", 100))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 5))
+JOB_RETRY_BASE = float(os.getenv("JOB_RETRY_BASE", 2.0))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1.0))
+# A running job belongs to its process until the lease expires; only then may another process take it over
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 600))
+
+# Semantic Memory Index Settings
+MEMORY_INDEX_DIM = int(os.getenv("MEMORY_INDEX_DIM", 256))
+MEMORY_INDEX_MIN_SCORE = float(os.getenv("MEMORY_INDEX_MIN_SCORE", 0.2))
+MEMORY_INDEX_SAVE_EVERY = int(os.getenv("MEMORY_INDEX_SAVE_EVERY", 50))
+
+# Response Cache Settings
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "response_cache.db")
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 20 * 1024 * 1024))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 24 * 60 * 60))
+SPLIT_CACHE_TTL = int(os.getenv("SPLIT_CACHE_TTL", 30 * 24 * 60 * 60))
+# Cosine similarity a paraphrase must reach before the exact content-token check; chosen from the
+# labeled paraphrase / non-paraphrase pairs in tests/test_response_cache.py (paraphrases score >= 0.95)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.9))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 2000))
+
+# Model Backend Settings
+# gemini (default), stub (offline, deterministic), record (Gemini + save responses) or replay
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "gemini")
+# fixed:S, uniform:LO,HI, normal:MEAN,SD, lognormal:MU,SIGMA or exponential:MEAN (seconds)
+MODEL_STUB_LATENCY = os.getenv("MODEL_STUB_LATENCY", "lognormal:-0.5,0.5")
+MODEL_STUB_SEED = int(os.getenv("MODEL_STUB_SEED", 0))
+MODEL_RECORDING_PATH = os.getenv("MODEL_RECORDING_PATH", "model_recording.jsonl")
+MODEL_REPLAY_LATENCY = os.getenv("MODEL_REPLAY_LATENCY", "false").lower() in ("1", "true", "yes")
+
+# LLM Gateway Settings
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 60))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", 60))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", 1000000))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 4))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", 1.0))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", 30))
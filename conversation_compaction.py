@@ -0,0 +1,113 @@
+"""
+Conversation retention for Second Brain Assistant
+Folds conversations older than MAX_CONVERSATION_HISTORY into a bounded
+rolling summary stored in conversation_summaries
+"""
+
+import re
+import threading
+from datetime import datetime
+from config import (
+    MAX_CONVERSATION_HISTORY, CONVERSATION_COMPACTION_BATCH, CONVERSATION_SUMMARY_MAX_CHARS
+)
+
+
+def first_sentence(text, max_chars=160):
+    """Return the first sentence of a text, shortened to max_chars"""
+    text = ' '.join((text or '').split())
+    match = re.match(r'(.+?[.!?])(\s|$)', text)
+    sentence = match.group(1) if match else text
+    if len(sentence) > max_chars:
+        sentence = sentence[:max_chars - 3].rstrip() + '...'
+    return sentence
+
+
+def summarize_exchange(user_message, assistant_response):
+    """Condense one exchange into a single summary line"""
+    return f"- You said: {first_sentence(user_message, 120)} | I replied: {first_sentence(assistant_response)}"
+
+
+def fold_summary(previous_summary, lines, max_chars=CONVERSATION_SUMMARY_MAX_CHARS):
+    """Append new lines to a rolling summary, dropping the oldest lines to stay under max_chars"""
+    all_lines = (previous_summary.splitlines() if previous_summary else []) + lines
+    kept = []
+    size = 0
+    for line in reversed(all_lines):
+        if size + len(line) + 1 > max_chars:
+            break
+        kept.append(line)
+        size += len(line) + 1
+    return '\n'.join(reversed(kept))
+
+
+class ConversationCompactor:
+    """Background worker that prunes old conversations into the rolling summary"""
+
+    def __init__(self, db, keep=MAX_CONVERSATION_HISTORY, batch_size=CONVERSATION_COMPACTION_BATCH):
+        self.db = db
+        self.keep = keep
+        self.batch_size = batch_size
+        self.compacted_total = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="conversation-compactor", daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        """Ask the worker to check the conversation count (called after inserts)"""
+        self._wake.set()
+
+    def compact_once(self):
+        """Fold the oldest conversations beyond the retention limit into the summary; returns rows folded"""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('SELECT COUNT(*) FROM conversations')
+            excess = cursor.fetchone()[0] - self.keep
+            # Wait for a full batch so we do not rewrite the summary on every message
+            if excess < self.batch_size:
+                return 0
+
+            cursor.execute('''
+                SELECT id, user_message, assistant_response
+                FROM conversations
+                ORDER BY id ASC
+                LIMIT ?
+            ''', (excess,))
+            rows = cursor.fetchall()
+
+            cursor.execute('SELECT summary FROM conversation_summaries ORDER BY id DESC LIMIT 1')
+            previous = cursor.fetchone()
+            summary = fold_summary(previous[0] if previous else '', [summarize_exchange(row[1], row[2]) for row in rows])
+
+            cursor.execute('''
+                INSERT INTO conversation_summaries (created_at, first_conversation_id, last_conversation_id, summary)
+                VALUES (?, ?, ?, ?)
+            ''', (datetime.now().isoformat(), rows[0][0], rows[-1][0], summary))
+            cursor.execute('DELETE FROM conversations WHERE id <= ?', (rows[-1][0],))
+            # Each summary already contains its predecessors, so only a short history is kept
+            cursor.execute('''
+                DELETE FROM conversation_summaries
+                WHERE id NOT IN (SELECT id FROM conversation_summaries ORDER BY id DESC LIMIT 10)
+            ''')
+
+        self.compacted_total += len(rows)
+        self.db.bump_write_version()
+        return len(rows)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.compact_once()
+            except Exception as e:
+                print(f"Conversation compaction failed: {str(e)}")
+
+    def close(self, timeout=None):
+        """Stop the background worker"""
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
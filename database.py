@@ -1,21 +1,313 @@
 import sqlite3
 import json
+import re
 from datetime import datetime
-from config import DATABASE_PATH
+from config import (
+    DATABASE_PATH, MEMORY_INDEX_MIN_SCORE, WRITE_BATCH_SIZE, WRITE_FLUSH_INTERVAL,
+    DB_JOURNAL_MODE, DB_SYNCHRONOUS, DB_BUSY_TIMEOUT_MS, DB_MMAP_SIZE, DB_CACHE_SIZE_KB,
+    DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_IDLE_TIMEOUT
+)
 from contextlib import contextmanager
+from memory_index import MemoryIndex
+from memory_eviction import MemoryEvictor
+from conversation_compaction import ConversationCompactor
 import threading
+import atexit
+import queue
+import time
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections with checkout/checkin and idle eviction"""
+    
+    def __init__(self, factory, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, idle_timeout=DB_POOL_IDLE_TIMEOUT):
+        self.factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._idle = []  # (connection, checked-in time), most recently used last
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {'hits': 0, 'misses': 0, 'waits': 0, 'evictions': 0}
+    
+    def checkout(self, timeout=None):
+        """Take a connection from the pool, opening one if below the size limit"""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._evict_idle()
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                if self._idle:
+                    conn, _ = self._idle.pop()
+                    self._stats['hits'] += 1
+                    return conn
+                if self._size < self.max_size:
+                    self._size += 1
+                    self._stats['misses'] += 1
+                    break
+                self._stats['waits'] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    raise TimeoutError(f"No database connection available after {timeout}s")
+        
+        # Open outside the lock so a slow connect does not block checkins
+        try:
+            return self.factory()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+    
+    def checkin(self, conn):
+        """Return a connection to the pool"""
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                conn.close()
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+    
+    def _evict_idle(self):
+        """Close connections that have sat unused longer than idle_timeout (lock held)"""
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._idle and self._idle[0][1] < cutoff:
+            conn, _ = self._idle.pop(0)
+            self._size -= 1
+            self._stats['evictions'] += 1
+            conn.close()
+    
+    def stats(self):
+        """Return pool size and usage counters"""
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'max_size': self.max_size,
+                **self._stats
+            }
+    
+    def close(self):
+        """Close idle connections; connections still checked out close on checkin"""
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                conn.close()
+            self._size -= len(self._idle)
+            self._idle = []
+            self._cond.notify_all()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class WriteBehindQueue:
+    """Background writer that groups conversation, memory and job inserts into batched transactions"""
+    
+    def __init__(self, db, batch_size=WRITE_BATCH_SIZE, flush_interval=WRITE_FLUSH_INTERVAL):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._closed = False
+        # Write errors by the thread that queued the lost rows, raised from that thread's next flush()
+        self._failed = {}
+        self._failed_lock = threading.Lock()
+        self._local = threading.local()
+        self._thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+        self._thread.start()
+    
+    def put_conversation(self, user_message, assistant_response, context="", task_type="", timestamp=None):
+        """Queue a conversation row for the next batch; timestamp defaults to now"""
+        timestamp = timestamp or datetime.now().isoformat()
+        self._put(('conversation', (timestamp, user_message, assistant_response, context, task_type)))
+    
+    def put_memory(self, content, category="general", importance=1):
+        """Queue a memory row for the next batch"""
+        self._put(('memory', (datetime.now().isoformat(), content, category, importance)))
+    
+    def put_job(self, row, on_written=None, on_error=None):
+        """Queue a jobs-table row; on_written(job_id) or on_error(exception) runs on the writer thread"""
+        self._put(('job', (row, on_written, on_error)))
+    
+    def begin_group(self):
+        """Hold the rows this thread queues until end_group(), so they are written in one transaction"""
+        self._local.group = []
+    
+    def end_group(self, ack=None, on_written=None, on_error=None):
+        """
+        Queue the held rows as one unit. ack is a (job_id, owner) pair deleted from the jobs table in the
+        same transaction; on_written(acked) or on_error(exception) runs on the writer thread afterwards.
+        """
+        rows, self._local.group = self._local.group, None
+        self._put(('group', (rows, ack, on_written, on_error)))
+    
+    def discard_group(self):
+        """Drop the rows held since begin_group()"""
+        self._local.group = None
+    
+    def _put(self, item):
+        if self._closed:
+            raise RuntimeError("Write-behind queue is closed")
+        group = getattr(self._local, 'group', None)
+        if group is not None:
+            group.append(item)
+            return
+        self._queue.put((*item, threading.get_ident()))
+    
+    def flush(self, timeout=None):
+        """
+        Block until everything queued before this call has been written. Raises the write error
+        if any row this thread queued since its last flush could not be written.
+        """
+        if not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(('flush', done, threading.get_ident()))
+        if not done.wait(timeout):
+            return False
+        with self._failed_lock:
+            error = self._failed.pop(threading.get_ident(), None)
+        if error is not None:
+            raise error
+        return True
+    
+    def close(self, timeout=None):
+        """Drain pending writes and stop the writer thread"""
+        if self._closed:
+            return
+        try:
+            self.flush(timeout)
+        except Exception:
+            pass  # Already reported by the writer thread
+        self._closed = True
+        self._queue.put(('stop', None, None))
+        self._thread.join(timeout)
+    
+    def _run(self):
+        pending = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                kind, payload, owner = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                kind, payload, owner = 'timeout', None, None
+            
+            if kind in ('conversation', 'memory', 'job', 'group'):
+                pending.append((kind, payload, owner))
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(pending) < self.batch_size:
+                    continue
+            
+            if pending:
+                self._write_batch(pending)
+                pending = []
+            deadline = None
+            
+            if kind == 'flush':
+                payload.set()
+            elif kind == 'stop':
+                return
+    
+    def _write_batch(self, batch):
+        rows = {'conversation': [], 'memory': [], 'job': []}
+        acks, callbacks = [], []  # callbacks: (on_written, on_error, 'job' or 'ack')
+        for kind, payload, _ in batch:
+            if kind != 'group':
+                items = [(kind, payload)]
+            else:
+                items, ack, on_written, on_error = payload
+                if ack is not None:
+                    acks.append(ack)
+                    callbacks.append((on_written, on_error, 'ack'))
+            for item_kind, item in items:
+                if item_kind == 'job':
+                    item, on_written, on_error = item
+                    callbacks.append((on_written, on_error, 'job'))
+                rows[item_kind].append(item)
+        try:
+            job_ids, acked = self.db.write_batch(rows['conversation'], rows['memory'], rows['job'], acks)
+        except Exception as e:
+            print(f"Failed to write {len(batch)} queued rows: {str(e)}")
+            with self._failed_lock:
+                for _, _, owner in batch:
+                    self._failed[owner] = e
+            results = [(on_error, e) for _, on_error, _ in callbacks]
+        else:
+            job_ids, acked = iter(job_ids), iter(acked)
+            results = [(on_written, next(job_ids) if kind == 'job' else next(acked)) for on_written, _, kind in callbacks]
+        for callback, value in results:
+            try:
+                if callback is not None:
+                    callback(value)
+            except Exception as e:
+                print(f"Write-behind callback failed: {str(e)}")
+
 
 class SecondBrainDB:
     def __init__(self):
         self.db_path = DATABASE_PATH
-        self._connection_pool = {}
-        self._pool_lock = threading.Lock()
+        self._pool = ConnectionPool(self._pooled_connection)
+        self._local = threading.local()
+        self._version_lock = threading.Lock()
+        self.write_version = 0
+        self.fts_enabled = False
         self.init_database()
         self.create_indexes()
+        # PRAGMA data_version is per connection, so one dedicated connection watches for other writers
+        self._version_conn = self.connect()
+        self.memory_index = MemoryIndex(self.db_path)
+        self.sync_memory_index()
+        self.write_queue = WriteBehindQueue(self)
+        self.evictor = MemoryEvictor(self)
+        self.evictor.notify()
+        self.compactor = ConversationCompactor(self)
+        self.compactor.notify()
+        atexit.register(self.close)
+    
+    def connect(self):
+        """Open a new connection with the configured storage settings applied"""
+        conn = sqlite3.connect(self.db_path, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        self.configure_connection(conn)
+        return conn
+    
+    def _pooled_connection(self):
+        """Connection factory for the pool"""
+        conn = self.connect()
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def configure_connection(self, conn):
+        """Apply per-connection pragmas (busy timeout, durability, mmap and page cache)"""
+        synchronous = DB_SYNCHRONOUS.upper()
+        if synchronous not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+            synchronous = 'NORMAL'
+        conn.execute(f'PRAGMA busy_timeout = {int(DB_BUSY_TIMEOUT_MS)}')
+        conn.execute(f'PRAGMA synchronous = {synchronous}')
+        conn.execute(f'PRAGMA mmap_size = {int(DB_MMAP_SIZE)}')
+        # Negative cache_size is interpreted by SQLite as KiB rather than pages
+        conn.execute(f'PRAGMA cache_size = {-abs(int(DB_CACHE_SIZE_KB))}')
+    
+    def configure_journal(self, conn):
+        """Switch the database file to the configured journal mode (persistent across connections)"""
+        journal_mode = DB_JOURNAL_MODE.upper()
+        if journal_mode not in ('WAL', 'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'OFF'):
+            journal_mode = 'WAL'
+        conn.execute(f'PRAGMA journal_mode = {journal_mode}')
     
     def init_database(self):
         """Initialize the database with required tables"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
+        self.configure_journal(conn)
         cursor = conn.cursor()
         
         # Create conversations table
@@ -30,6 +322,17 @@ class SecondBrainDB:
             )
         ''')
         
+        # Rolling summaries of conversations pruned by the compactor
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS conversation_summaries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TEXT NOT NULL,
+                first_conversation_id INTEGER,
+                last_conversation_id INTEGER,
+                summary TEXT NOT NULL
+            )
+        ''')
+        
         # Check if memory table exists and has the correct schema
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='memory'")
         memory_table_exists = cursor.fetchone() is not None
@@ -42,6 +345,7 @@ class SecondBrainDB:
             if 'user_message' in columns and 'assistant_response' in columns:
                 # Old schema detected - drop and recreate
                 cursor.execute("DROP TABLE memory")
+                cursor.execute("DROP TABLE IF EXISTS memory_fts")
                 print("Migrating memory table to new schema...")
         
         # Create memory table with correct schema
@@ -51,10 +355,37 @@ class SecondBrainDB:
                 timestamp TEXT NOT NULL,
                 content TEXT NOT NULL,
                 category TEXT,
-                importance INTEGER DEFAULT 1
+                importance INTEGER DEFAULT 1,
+                access_count INTEGER DEFAULT 0,
+                last_accessed TEXT
             )
         ''')
         
+        # Add access tracking columns to databases created before eviction existed
+        cursor.execute("PRAGMA table_info(memory)")
+        columns = [column[1] for column in cursor.fetchall()]
+        if 'access_count' not in columns:
+            cursor.execute("ALTER TABLE memory ADD COLUMN access_count INTEGER DEFAULT 0")
+        if 'last_accessed' not in columns:
+            cursor.execute("ALTER TABLE memory ADD COLUMN last_accessed TEXT")
+        
+        # Evicted memories are kept here instead of being deleted
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS memory_archive (
+                id INTEGER PRIMARY KEY,
+                timestamp TEXT NOT NULL,
+                content TEXT NOT NULL,
+                category TEXT,
+                importance INTEGER DEFAULT 1,
+                access_count INTEGER DEFAULT 0,
+                last_accessed TEXT,
+                archived_at TEXT NOT NULL
+            )
+        ''')
+        
+        # Full-text index over memory content, kept in sync by triggers
+        self.init_memory_fts(cursor)
+        
         # Create user profile table for personal information
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS user_profile (
@@ -70,25 +401,125 @@ class SecondBrainDB:
                 last_updated TEXT
             )
         ''')
+        # Durable background jobs (see job_queue.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                last_error TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT,
+                owner TEXT,
+                lease_expires REAL
+            )
+        ''')
+        # Add lease columns to databases created before jobs were leased
+        cursor.execute("PRAGMA table_info(jobs)")
+        columns = [column[1] for column in cursor.fetchall()]
+        if 'owner' not in columns:
+            cursor.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        if 'lease_expires' not in columns:
+            cursor.execute("ALTER TABLE jobs ADD COLUMN lease_expires REAL")
         # Removed tasks table creation
         conn.commit()
         conn.close()
     
+    def init_memory_fts(self, cursor):
+        """Create the FTS5 index for memories and backfill it for existing databases"""
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='memory_fts'")
+        fts_exists = cursor.fetchone() is not None
+        
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts USING fts5(
+                    content,
+                    content='memory',
+                    content_rowid='id'
+                )
+            ''')
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5 - search_memories falls back to LIKE
+            self.fts_enabled = False
+            return
+        
+        # Keep the index in sync with the memory table
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS memory_fts_insert AFTER INSERT ON memory BEGIN
+                INSERT INTO memory_fts(rowid, content) VALUES (new.id, new.content);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS memory_fts_delete AFTER DELETE ON memory BEGIN
+                INSERT INTO memory_fts(memory_fts, rowid, content) VALUES ('delete', old.id, old.content);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS memory_fts_update AFTER UPDATE OF content ON memory BEGIN
+                INSERT INTO memory_fts(memory_fts, rowid, content) VALUES ('delete', old.id, old.content);
+                INSERT INTO memory_fts(rowid, content) VALUES (new.id, new.content);
+            END
+        ''')
+        
+        if not fts_exists:
+            # Backfill rows written before the index existed
+            cursor.execute("INSERT INTO memory_fts(memory_fts) VALUES ('rebuild')")
+        self.fts_enabled = True
+    
     @contextmanager
     def get_connection(self):
         """Get a database connection from the pool"""
-        thread_id = threading.get_ident()
-        
-        with self._pool_lock:
-            if thread_id not in self._connection_pool:
-                self._connection_pool[thread_id] = sqlite3.connect(self.db_path)
-                self._connection_pool[thread_id].row_factory = sqlite3.Row
+        # Nested use on the same thread shares the outer connection and transaction
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
         
-        conn = self._connection_pool[thread_id]
+        conn = self._pool.checkout()
+        self._local.conn = conn
         try:
             yield conn
-        finally:
             conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._pool.checkin(conn)
+    
+    def pool_stats(self):
+        """Return connection pool statistics (size, waits, hits, ...)"""
+        return self._pool.stats()
+    
+    def sync_memory_index(self):
+        """Bring the semantic memory index in line with the memory table (ids and row count)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id FROM memory')
+            db_ids = {row[0] for row in cursor.fetchall()}
+            indexed_ids = self.memory_index.ids()
+            if len(indexed_ids) != len(self.memory_index):
+                # Row count and id map disagree: the loaded file cannot be trusted, so rebuild it
+                self.memory_index.clear()
+                indexed_ids = set()
+            
+            stale_ids = indexed_ids - db_ids
+            missing_ids = sorted(db_ids - indexed_ids)
+            if stale_ids:
+                self.memory_index.remove_many(stale_ids)
+            
+            # Embed missing rows in chunks to keep memory bounded on large stores
+            for start in range(0, len(missing_ids), 500):
+                chunk = missing_ids[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f'SELECT id, content FROM memory WHERE id IN ({placeholders})', chunk)
+                self.memory_index.add_many(cursor.fetchall())
+        
+        if stale_ids or missing_ids:
+            self.memory_index.save()
     
     def create_indexes(self):
         """Create indexes for faster queries"""
@@ -105,6 +536,9 @@ class SecondBrainDB:
             
             # Index for user profile
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_profile_timestamp ON user_profile(timestamp DESC)')
+            
+            # Index for claiming the next runnable job
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_available ON jobs(status, available_at)')
     
     def save_conversation(self, user_message, assistant_response, context="", task_type=""):
         """Save a conversation exchange to the database"""
@@ -114,6 +548,79 @@ class SecondBrainDB:
                 INSERT INTO conversations (timestamp, user_message, assistant_response, context, task_type)
                 VALUES (?, ?, ?, ?, ?)
             ''', (datetime.now().isoformat(), user_message, assistant_response, context, task_type))
+        self.bump_write_version()
+        self.compactor.notify()
+    
+    def write_batch(self, conversations, memories, jobs=(), acks=()):
+        """
+        Insert many conversation, memory and job rows and delete acknowledged (job_id, owner) jobs in a
+        single transaction; returns (new job ids, whether each ack deleted its job)
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            job_ids = []
+            for job in jobs:
+                cursor.execute('''
+                    INSERT INTO jobs (kind, payload, status, attempts, available_at, created_at, updated_at, owner, lease_expires)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', job)
+                job_ids.append(cursor.lastrowid)
+            # A job that outlived its lease may belong to another process by now, so only the owner's row goes
+            acked = [cursor.execute('DELETE FROM jobs WHERE id = ? AND owner = ?', ack).rowcount > 0 for ack in acks]
+            if conversations:
+                cursor.executemany('''
+                    INSERT INTO conversations (timestamp, user_message, assistant_response, context, task_type)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', conversations)
+            if memories:
+                cursor.executemany('''
+                    INSERT INTO memory (timestamp, content, category, importance)
+                    VALUES (?, ?, ?, ?)
+                ''', memories)
+                # Still inside the write transaction, so the newest rows are ours
+                cursor.execute('SELECT id, content FROM memory ORDER BY id DESC LIMIT ?', (len(memories),))
+                self.memory_index.add_many(cursor.fetchall())
+        if conversations or memories:
+            self.bump_write_version()
+        if conversations:
+            self.compactor.notify()
+        if memories:
+            self.evictor.notify()
+        return job_ids, acked
+    
+    def bump_write_version(self):
+        """Mark that data used to build the assistant's context has changed"""
+        with self._version_lock:
+            self.write_version += 1
+            return self.write_version
+    
+    def change_version(self):
+        """
+        Key that changes whenever the data may have changed: this process's write version plus
+        SQLite's data_version, which moves when any other connection or process commits to the file
+        """
+        with self._version_lock:
+            data_version = self._version_conn.execute('PRAGMA data_version').fetchone()[0]
+            return (self.write_version, data_version)
+    
+    def flush_writes(self, timeout=None):
+        """Wait until all queued conversation and memory writes are on disk; raises if this thread's rows were lost"""
+        return self.write_queue.flush(timeout)
+    
+    def close(self):
+        """Drain queued writes, persist the memory index and close pooled connections"""
+        self.write_queue.close()
+        self.evictor.close()
+        self.compactor.close()
+        self.memory_index.save()
+        self._version_conn.close()
+        self._pool.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
     
     def get_recent_conversations(self, limit=10):
         """Get recent conversations for context"""
@@ -127,6 +634,14 @@ class SecondBrainDB:
             ''', (limit,))
             return cursor.fetchall()
     
+    def get_conversation_summary(self):
+        """Get the rolling summary of conversations that have been compacted away"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT summary FROM conversation_summaries ORDER BY id DESC LIMIT 1')
+            row = cursor.fetchone()
+            return row[0] if row else ''
+    
     def save_memory(self, content, category="general", importance=1):
         """Save important information to memory"""
         with self.get_connection() as conn:
@@ -135,6 +650,9 @@ class SecondBrainDB:
                 INSERT INTO memory (timestamp, content, category, importance)
                 VALUES (?, ?, ?, ?)
             ''', (datetime.now().isoformat(), content, category, importance))
+            self.memory_index.add(cursor.lastrowid, content)
+        self.bump_write_version()
+        self.evictor.notify()
 
     def get_memories(self, category=None, limit=20):
         """Retrieve memories, optionally filtered by category"""
@@ -157,19 +675,83 @@ class SecondBrainDB:
                 ''', (limit,))
             return cursor.fetchall()
     
-    def search_memories(self, query, limit=3):
-        """Search memories by keyword in content, sorted by recency"""
+    def record_memory_access(self, memory_ids):
+        """Count a recall of these memories so the evictor keeps frequently used ones"""
+        if not memory_ids:
+            return
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            placeholders = ','.join('?' * len(memory_ids))
+            cursor.execute(f'''
+                UPDATE memory
+                SET access_count = COALESCE(access_count, 0) + 1, last_accessed = ?
+                WHERE id IN ({placeholders})
+            ''', [datetime.now().isoformat()] + list(memory_ids))
+    
+    def get_archived_memories(self, limit=20):
+        """Retrieve memories that were evicted to the archive, newest first"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT id, content, category, importance, timestamp
-                FROM memory
-                WHERE content LIKE ?
-                ORDER BY importance DESC, timestamp DESC
+                FROM memory_archive
+                ORDER BY archived_at DESC
                 LIMIT ?
-            ''', (f'%{query}%', limit))
+            ''', (limit,))
             return cursor.fetchall()
     
+    def _build_fts_query(self, query):
+        """Turn free text into a safe FTS5 MATCH expression (prefix match on every term)"""
+        terms = re.findall(r'\w+', query.lower())
+        return ' '.join(f'"{term}"*' for term in terms)
+    
+    def search_memories(self, query, limit=3):
+        """Search memories by keyword in content, ranked by importance, BM25 relevance and recency"""
+        fts_query = self._build_fts_query(query) if self.fts_enabled else ''
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if fts_query:
+                cursor.execute('''
+                    SELECT m.id, m.content, m.category, m.importance, m.timestamp
+                    FROM memory_fts
+                    JOIN memory m ON m.id = memory_fts.rowid
+                    WHERE memory_fts MATCH ?
+                    ORDER BY m.importance DESC, bm25(memory_fts), m.timestamp DESC
+                    LIMIT ?
+                ''', (fts_query, limit))
+            else:
+                cursor.execute('''
+                    SELECT id, content, category, importance, timestamp
+                    FROM memory
+                    WHERE content LIKE ?
+                    ORDER BY importance DESC, timestamp DESC
+                    LIMIT ?
+                ''', (f'%{query}%', limit))
+            results = cursor.fetchall()
+        self.record_memory_access([row[0] for row in results])
+        return results
+    
+    def semantic_search_memories(self, query, limit=3, min_score=MEMORY_INDEX_MIN_SCORE):
+        """Find memories similar in meaning to the query using the vector index"""
+        matches = self.memory_index.search(query, k=limit, min_score=min_score)
+        if not matches:
+            return []
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            ids = [memory_id for memory_id, _ in matches]
+            placeholders = ','.join('?' * len(ids))
+            cursor.execute(f'''
+                SELECT id, content, category, importance, timestamp
+                FROM memory
+                WHERE id IN ({placeholders})
+            ''', ids)
+            rows = {row[0]: row for row in cursor.fetchall()}
+        # Preserve similarity order
+        results = [rows[memory_id] for memory_id in ids if memory_id in rows]
+        self.record_memory_access([row[0] for row in results])
+        return results
+    
     def delete_memory(self, memory_id):
         """Delete a specific memory by ID"""
         with self.get_connection() as conn:
@@ -178,7 +760,11 @@ class SecondBrainDB:
                 DELETE FROM memory
                 WHERE id = ?
             ''', (memory_id,))
-            return cursor.rowcount > 0
+            deleted = cursor.rowcount > 0
+        if deleted:
+            self.memory_index.remove(memory_id)
+            self.bump_write_version()
+        return deleted
     
     def save_user_profile(self, name=None, birthday=None, age=None, interests=None, friends=None, important_dates=None, personal_notes=None):
         """Save or update user profile information"""
@@ -218,6 +804,7 @@ class SecondBrainDB:
                     INSERT INTO user_profile (timestamp, name, birthday, age, interests, friends, important_dates, personal_notes, last_updated)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (datetime.now().isoformat(), name, birthday, age, interests, friends, important_dates, personal_notes, datetime.now().isoformat()))
+        self.bump_write_version()
     
     def get_user_profile(self):
         """Get the current user profile"""
@@ -7,6 +7,9 @@ import re
 from functools import lru_cache
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from llm_gateway import as_gateway
+from singleflight import SingleFlight
+from metrics import metrics
 
 load_dotenv()
 
@@ -16,6 +19,8 @@ CSE_ID = os.getenv('GOOGLE_CSE_ID')
 # Cache for search results
 _search_cache = {}
 _cache_lock = threading.Lock()
+# Identical searches already under way are joined rather than repeated
+_search_flights = SingleFlight()
 
 # Existing simple search
 
@@ -42,19 +47,39 @@ def google_search(query, num_results=3):
         results.append({"title": "Error", "snippet": f"Status code: {response.status_code}", "link": ""})
     return results
 
+def _timed_google_search(query, num_results):
+    """google_search with its latency recorded under the google_search call site"""
+    started = time.monotonic()
+    error = None
+    try:
+        return google_search(query, num_results)
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        metrics.record_call('google_search', time.monotonic() - started, len(query.encode('utf-8')), error=error)
+
 # Advanced web search for best results
 
 def advanced_web_search(query, gemini_model, num_results=5, snippet_enrich=True, query_expansion=True, sleep_between=0.5):
     """
     Advanced web search with LLM-powered snippet enrichment and query expansion.
-    Requires a Gemini model for LLM tasks.
+    Requires a Gemini model or LLMGateway for LLM tasks.
     """
     # Check cache first
     cache_key = f"{query}:{num_results}:{snippet_enrich}:{query_expansion}"
     with _cache_lock:
         if cache_key in _search_cache:
+            metrics.record_cache('advanced_web_search', 'hit')
             return _search_cache[cache_key]
-    
+    metrics.record_cache('advanced_web_search', 'miss')
+    return _search_flights.do(cache_key, lambda: _advanced_web_search(
+        query, gemini_model, cache_key, num_results, snippet_enrich, query_expansion
+    ))
+
+def _advanced_web_search(query, gemini_model, cache_key, num_results, snippet_enrich, query_expansion):
+    """Run the search pipeline for advanced_web_search and cache its results"""
+    llm = as_gateway(gemini_model)
     all_results = []
     queries = [query]
     
@@ -62,8 +87,7 @@ def advanced_web_search(query, gemini_model, num_results=5, snippet_enrich=True,
     if query_expansion and len(query.split()) > 3:  # Only expand complex queries
         prompt = f"""Expand this search query into 1-2 alternative queries. Return as JSON list: "{query}"""
         try:
-            resp = gemini_model.generate_content(prompt)
-            expanded = resp.text if hasattr(resp, 'text') else resp.candidates[0].content.parts[0].text
+            expanded = llm.generate_sync(prompt, site='advanced_web_search.expand')
             expanded = expanded.strip()
             match = re.search(r'\[.*\]', expanded, re.DOTALL)
             if match:
@@ -79,7 +103,7 @@ def advanced_web_search(query, gemini_model, num_results=5, snippet_enrich=True,
     
     # 2. Parallel multi-query search
     with ThreadPoolExecutor(max_workers=3) as executor:
-        future_to_query = {executor.submit(google_search, q, num_results): q for q in queries[:2]}  # Limit queries
+        future_to_query = {executor.submit(_timed_google_search, q, num_results): q for q in queries[:2]}  # Limit queries
         for future in as_completed(future_to_query):
             try:
                 results = future.result(timeout=5)  # 5 second timeout
@@ -108,21 +132,30 @@ def advanced_web_search(query, gemini_model, num_results=5, snippet_enrich=True,
     deduped.sort(key=rank_score, reverse=True)
     # 5. Snippet enrichment (fetch and summarize top N pages)
     if snippet_enrich:
-        for i, item in enumerate(deduped[:2]):  # Only top 2 for speed
+        def enrich(item):
             try:
-                resp = requests.get(item['link'], timeout=5)
+                started = time.monotonic()
+                try:
+                    resp = requests.get(item['link'], timeout=5)
+                except Exception as e:
+                    metrics.record_call('advanced_web_search.fetch', time.monotonic() - started, error=type(e).__name__)
+                    raise
+                metrics.record_call('advanced_web_search.fetch', time.monotonic() - started, response_bytes=len(resp.content))
                 soup = BeautifulSoup(resp.text, 'html.parser')
                 # Get visible text
                 texts = soup.stripped_strings
                 page_text = ' '.join(list(texts)[:500])  # limit for speed
                 # Summarize with LLM
                 prompt = f"Summarize the following web page content in 2-3 sentences, focusing on the main facts and insights.\n\nContent:\n{page_text}\n\nSummary:"
-                resp = gemini_model.generate_content(prompt)
-                summary = resp.text if hasattr(resp, 'text') else resp.candidates[0].content.parts[0].text
+                summary = llm.generate_sync(prompt, site='advanced_web_search.enrich')
                 summary = summary.strip()
                 item['enriched_snippet'] = summary
             except Exception:
                 item['enriched_snippet'] = None
+        
+        # Fetch and summarize the top pages concurrently
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(enrich, deduped[:2]))  # Only top 2 for speed
     with _cache_lock:
         _search_cache[cache_key] = deduped[:num_results]
     return deduped[:num_results]
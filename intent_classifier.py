@@ -0,0 +1,205 @@
+"""
+Offline intent classifier for Second Brain Assistant
+Answers the small classification questions (is this a time/date request,
+should the answer cite references, does the message hold several questions)
+locally with rules plus a naive Bayes model shipped in intent_model.json.
+Only low-confidence cases go to Gemini; those are counted and appended to
+INTENT_FALLBACK_LOG so they can be added to the training data later.
+
+Retrain the shipped model with: python intent_classifier.py
+"""
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+from config import INTENT_MODEL_PATH, INTENT_CONFIDENCE_THRESHOLD, INTENT_FALLBACK_LOG
+
+TRAINING_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_training.json")
+
+_TIME_DATE_WORDS = re.compile(r"\b(time|date|day|today|clock|hour|month|year|o'?clock)\b")
+_TIME_QUESTION = re.compile(
+    r"^(hey |hi |ok |so )?((what|which) time is it|(what'?s|what is|tell me|give me) the (current )?time|current time)"
+    r"( (is it|now|right now|please))*\W*$"
+)
+_DATE_QUESTION = re.compile(
+    r"^(hey |hi |ok |so )?((what|which) (date|day|month|year) is (it|today)|(what'?s|what is|tell me|give me) "
+    r"(the |today'?s )?(current )?date( today)?|what'?s today|what is today|current date|today'?s date)"
+    r"( (is it|now|right now|please))*\W*$"
+)
+_REFERENCE_WORDS = re.compile(
+    r"\b(sources?|references?|citations?|cite|links?|papers?|stud(y|ies)|research|statistics|evidence|according to)\b"
+)
+_SMALL_TALK = re.compile(r"^(hi|hello|hey|thanks|thank you|ok|okay|good (morning|afternoon|evening|night)|bye)\b[\w\s]{0,20}\W*$")
+_CONJUNCTIONS = re.compile(r"\b(and|also|plus|then)\b|;")
+
+
+def tokenize(text):
+    """Lowercase word and bigram features, plus a question-mark count feature"""
+    words = re.findall(r"[a-z0-9']+", (text or '').lower())
+    features = words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+    features.append(f"__qmarks_{min(text.count('?'), 3)}")
+    return features
+
+
+def split_on_question_marks(text):
+    """Split 'What is X? How does Y work?' into its questions; returns [text] when there is only one"""
+    parts = [part.strip() for part in re.split(r'(?<=\?)\s+', text.strip()) if part.strip()]
+    return parts if len(parts) > 1 else [text]
+
+
+def train_model(examples, alpha=1.0):
+    """Fit a multinomial naive Bayes model per task from {task: [[text, label], ...]}"""
+    model = {}
+    for task, rows in examples.items():
+        label_counts = Counter(label for _, label in rows)
+        token_counts = defaultdict(Counter)
+        for text, label in rows:
+            token_counts[label].update(tokenize(text))
+        vocab = set().union(*token_counts.values())
+        task_model = {'priors': {}, 'likelihoods': {}, 'unseen': {}}
+        for label, count in label_counts.items():
+            total = sum(token_counts[label].values()) + alpha * len(vocab)
+            task_model['priors'][label] = math.log(count / len(rows))
+            task_model['unseen'][label] = math.log(alpha / total)
+            task_model['likelihoods'][label] = {
+                token: round(math.log((n + alpha) / total), 4) for token, n in token_counts[label].items()
+            }
+        task_model['vocab'] = sorted(vocab)
+        model[task] = task_model
+    return model
+
+
+class IntentClassifier:
+    """Rule + naive Bayes classifier that decides when an LLM classification call is needed"""
+
+    def __init__(self, model_path=INTENT_MODEL_PATH, threshold=INTENT_CONFIDENCE_THRESHOLD, fallback_log=INTENT_FALLBACK_LOG):
+        self.threshold = threshold
+        self.fallback_log = fallback_log
+        self.model = {}
+        self._vocab = {}
+        self._lock = threading.Lock()
+        self.counts = defaultdict(Counter)
+        try:
+            with open(model_path, 'r', encoding='utf-8') as f:
+                self.model = json.load(f)
+            self._vocab = {task: set(task_model['vocab']) for task, task_model in self.model.items()}
+        except Exception as e:
+            print(f"Intent model unavailable, classification will use the LLM: {str(e)}")
+
+    def _rules(self, task, text):
+        """Return a label for clear-cut cases, or None to defer to the model"""
+        lowered = ' '.join(text.lower().split())
+        if task == 'time_date':
+            if not _TIME_DATE_WORDS.search(lowered):
+                return 'none'
+            if _TIME_QUESTION.match(lowered):
+                return 'time'
+            if _DATE_QUESTION.match(lowered):
+                return 'date'
+        elif task == 'references':
+            if _REFERENCE_WORDS.search(lowered):
+                return 'yes'
+            if _SMALL_TALK.match(lowered):
+                return 'no'
+        elif task == 'multi_question':
+            if text.count('?') >= 2 and len(split_on_question_marks(text)) > 1:
+                return 'multi'
+            if '?' not in text.rstrip()[:-1] and not _CONJUNCTIONS.search(lowered):
+                return 'single'
+        return None
+
+    def _predict(self, task, text):
+        """Naive Bayes posterior: returns (label, probability) or (None, 0.0) without a model"""
+        task_model = self.model.get(task)
+        if not task_model:
+            return None, 0.0
+        features = [token for token in tokenize(text) if token in self._vocab[task]]
+        scores = {}
+        for label, prior in task_model['priors'].items():
+            likelihoods = task_model['likelihoods'][label]
+            unseen = task_model['unseen'][label]
+            scores[label] = prior + sum(likelihoods.get(token, unseen) for token in features)
+        best = max(scores, key=scores.get)
+        # Softmax over log scores, shifted by the max for numerical stability
+        total = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1.0 / total
+
+    def classify(self, task, text):
+        """Return (label, confidence, source) where source is 'rule' or 'model'"""
+        label = self._rules(task, text)
+        if label is not None:
+            return label, 1.0, 'rule'
+        label, confidence = self._predict(task, text)
+        return label, confidence, 'model'
+
+    def record(self, task, source):
+        """Count a locally answered classification"""
+        with self._lock:
+            self.counts[task][source] += 1
+
+    def record_fallback(self, task, text, local_label, confidence, llm_label):
+        """Count an LLM fallback and append it to the fallback log for later retraining"""
+        with self._lock:
+            self.counts[task]['llm'] += 1
+            if not self.fallback_log:
+                return
+            try:
+                with open(self.fallback_log, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({
+                        'timestamp': datetime.now().isoformat(),
+                        'task': task,
+                        'text': text,
+                        'local_label': local_label,
+                        'confidence': round(confidence, 4),
+                        'llm_label': llm_label,
+                    }) + '\n')
+            except Exception:
+                pass
+
+    def decide(self, task, text, llm_fallback):
+        """Classify locally, calling llm_fallback() for a label only when confidence is below the threshold"""
+        label, confidence, source = self.classify(task, text)
+        if label is not None and confidence >= self.threshold:
+            self.record(task, source)
+            return label
+        try:
+            llm_label = llm_fallback()
+        except Exception:
+            llm_label = None
+        self.record_fallback(task, text, label, confidence, llm_label)
+        return llm_label if llm_label is not None else label
+
+    def stats(self):
+        """Per-task counts of rule, model and LLM answers plus the overall fallback rate"""
+        with self._lock:
+            per_task = {task: dict(counts) for task, counts in self.counts.items()}
+        total = sum(sum(counts.values()) for counts in per_task.values())
+        fallbacks = sum(counts.get('llm', 0) for counts in per_task.values())
+        return {
+            'tasks': per_task,
+            'total': total,
+            'llm_fallbacks': fallbacks,
+            'fallback_rate': fallbacks / total if total else 0.0,
+        }
+
+
+if __name__ == '__main__':
+    with open(TRAINING_PATH, 'r', encoding='utf-8') as f:
+        training = json.load(f)
+    # Fold in LLM-labelled fallbacks collected while running
+    if INTENT_FALLBACK_LOG and os.path.exists(INTENT_FALLBACK_LOG):
+        with open(INTENT_FALLBACK_LOG, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry.get('llm_label') and entry.get('task') in training:
+                    training[entry['task']].append([entry['text'], entry['llm_label']])
+    with open(INTENT_MODEL_PATH, 'w', encoding='utf-8') as f:
+        json.dump(train_model(training), f, separators=(',', ':'))
+    print(f"Wrote {INTENT_MODEL_PATH} ({', '.join(f'{task}: {len(rows)} examples' for task, rows in training.items())})")
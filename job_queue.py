@@ -0,0 +1,234 @@
+"""
+Durable background job queue for Second Brain Assistant
+Jobs are stored in the jobs table through the database's write-behind
+batches, so enqueue never touches the database on the caller's thread, and
+a job is only deleted in the same transaction that writes the rows its
+handler queued. Unfinished jobs survive Ctrl-C or a crash and are replayed
+on the next start (a job enqueued less than WRITE_FLUSH_INTERVAL before a
+crash is lost along with the rest of that batch). A small worker pool runs
+them, failed jobs are retried with backoff, and the in-memory hand-off queue
+is bounded - when it is full, jobs wait in the table until a worker polls.
+Several processes can share one jobs table: a claimed job is leased to its
+process and is only taken over by another one after the lease expires.
+"""
+
+import json
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from config import JOB_WORKERS, JOB_QUEUE_DEPTH, JOB_MAX_ATTEMPTS, JOB_RETRY_BASE, JOB_POLL_INTERVAL, JOB_LEASE_SECONDS
+
+
+class JobQueue:
+    """SQLite-backed job queue with a worker pool, retries and replay on startup"""
+
+    def __init__(self, db, handlers, workers=JOB_WORKERS, depth=JOB_QUEUE_DEPTH,
+                 max_attempts=JOB_MAX_ATTEMPTS, retry_base=JOB_RETRY_BASE, poll_interval=JOB_POLL_INTERVAL,
+                 lease_seconds=JOB_LEASE_SECONDS):
+        self.db = db
+        self.handlers = handlers
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.poll_interval = poll_interval
+        self.counts = Counter()
+        self._counts_lock = threading.Lock()
+        self._unwritten = 0  # enqueued jobs still waiting for their write-behind batch
+        self._ready = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self.replayed = self._recover()
+        self._workers = [
+            threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True) for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _count(self, key, n=1):
+        with self._counts_lock:
+            self.counts[key] += n
+
+    def _recover(self):
+        """Requeue running jobs whose lease has expired (their process is gone); returns how many are waiting"""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            # Jobs leased to another live process are left alone
+            cursor.execute('''
+                UPDATE jobs SET status = 'pending', owner = NULL, lease_expires = NULL
+                WHERE status = 'running' AND (lease_expires IS NULL OR lease_expires <= ?)
+            ''', (time.time(),))
+            cursor.execute("SELECT COUNT(*) FROM jobs WHERE status = 'pending'")
+            return cursor.fetchone()[0]
+
+    def enqueue(self, kind, payload):
+        """Queue a job for the next write-behind batch; a worker gets it once it is stored. Never blocks"""
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        now, stamp, payload = time.time(), datetime.now().isoformat(), json.dumps(payload)
+        # Stored already leased to this process, so the worker needs no separate claim transaction
+        row = (kind, payload, 'running', 0, now, stamp, stamp, self.owner, now + self.lease_seconds)
+        with self._counts_lock:
+            self._unwritten += 1
+            self.counts['enqueued'] += 1
+        self.db.write_queue.put_job(row, on_written=lambda job_id: self._stored(job_id, kind, payload),
+                                    on_error=self._not_stored)
+
+    def _stored(self, job_id, kind, payload):
+        """Write-behind callback: the job is in the table, hand it to a worker"""
+        with self._counts_lock:
+            self._unwritten -= 1
+        try:
+            self._ready.put_nowait((job_id, kind, payload, 0))
+        except queue.Full:
+            # Give up the lease so the job waits as pending until a worker polls for it
+            self._count('overflowed')
+            self._release(job_id)
+
+    def _not_stored(self, error):
+        with self._counts_lock:
+            self._unwritten -= 1
+            self.counts['lost'] += 1
+
+    def _release(self, job_id=None):
+        """Hand a running job (or every job this process is running) back to the queue"""
+        with self.db.get_connection() as conn:
+            conn.execute(f'''
+                UPDATE jobs SET status = 'pending', owner = NULL, lease_expires = NULL
+                WHERE status = 'running' AND owner = ? {'AND id = ?' if job_id is not None else ''}
+            ''', (self.owner,) if job_id is None else (self.owner, job_id))
+
+    def _claim(self):
+        """Atomically lease the oldest runnable job to this process; returns (id, kind, payload, attempts) or None"""
+        # Runnable: pending and due, or running under a lease that has expired (its process died)
+        runnable = "((status = 'pending' AND available_at <= ?) OR (status = 'running' AND lease_expires <= ?))"
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            # Cheap read first so idle polling does not take the write lock
+            now = time.time()
+            cursor.execute(f'''
+                SELECT id FROM jobs
+                WHERE {runnable}
+                ORDER BY id ASC
+                LIMIT 1
+            ''', (now, now))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            job_id = row[0]
+            cursor.execute('BEGIN IMMEDIATE')
+            now = time.time()
+            cursor.execute(f'''
+                SELECT id, kind, payload, attempts FROM jobs
+                WHERE id = ? AND {runnable}
+            ''', (job_id, now, now))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            cursor.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, lease_expires = ?, updated_at = ? WHERE id = ?",
+                (self.owner, now + self.lease_seconds, datetime.now().isoformat(), row[0])
+            )
+            return row
+
+    def _acknowledged(self, acked):
+        # A job that outlived its lease may already belong to another process
+        self._count('completed' if acked else 'lease_lost')
+
+    def _fail(self, job_id, attempts, error):
+        attempts += 1
+        if attempts >= self.max_attempts:
+            status, available_at = 'failed', time.time()
+            self._count('failed')
+            print(f"Background job {job_id} failed after {attempts} attempts: {error}")
+        else:
+            status, available_at = 'pending', time.time() + self.retry_base * (2 ** (attempts - 1))
+            self._count('retried')
+        with self.db.get_connection() as conn:
+            conn.execute('''
+                UPDATE jobs SET status = ?, attempts = ?, available_at = ?, last_error = ?, updated_at = ?,
+                                owner = NULL, lease_expires = NULL
+                WHERE id = ? AND owner = ?
+            ''', (status, attempts, available_at, error, datetime.now().isoformat(), job_id, self.owner))
+
+    def _run(self):
+        busy = False
+        while not self._stop.is_set():
+            try:
+                # While there is work, go straight on to the next job instead of waiting for one
+                job = self._ready.get_nowait() if busy else self._ready.get(timeout=self.poll_interval)
+            except queue.Empty:
+                try:
+                    # Retries, replayed jobs and other processes' jobs are only found by polling the table
+                    job = self._claim()
+                except Exception as e:
+                    print(f"Could not claim background job: {str(e)}")
+                    continue
+            busy = job is not None
+            if job is not None:
+                self._execute(*job)
+
+    def _execute(self, job_id, kind, payload, attempts):
+        writes = self.db.write_queue
+        # The rows the handler queues are written in the same transaction that deletes the job, so a job
+        # is acknowledged exactly when its work is stored and retried if that batch fails
+        writes.begin_group()
+        try:
+            self.handlers[kind](**json.loads(payload))
+        except Exception as e:
+            writes.discard_group()
+            self._fail(job_id, attempts, f"{type(e).__name__}: {str(e)}")
+            return
+        writes.end_group(
+            ack=(job_id, self.owner), on_written=self._acknowledged,
+            on_error=lambda e: self._fail(job_id, attempts, f"{type(e).__name__}: {str(e)}"),
+        )
+
+    def pending(self):
+        """Number of jobs waiting, running or not yet written"""
+        # Read before the table, so a job written in between is counted twice rather than missed
+        unwritten = self._unwritten
+        with self.db.get_connection() as conn:
+            stored = conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'running')").fetchone()[0]
+        return stored + unwritten
+
+    def stats(self):
+        """Enqueue/complete/retry/failure counters plus the current table backlog"""
+        with self.db.get_connection() as conn:
+            rows = conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        with self._counts_lock:
+            counts = dict(self.counts)
+        return {**counts, 'replayed_on_start': self.replayed, 'unwritten': self._unwritten, 'backlog': dict(rows)}
+
+    def close(self, drain_timeout=5.0):
+        """Give workers up to drain_timeout seconds to finish runnable jobs, then stop them; the rest replay next start"""
+        deadline = time.monotonic() + drain_timeout
+        # Jobs enqueued since the last write-behind batch are not in the table yet
+        self._flush_writes(deadline)
+        while time.monotonic() < deadline:
+            with self.db.get_connection() as conn:
+                # Other processes' running jobs are theirs to finish
+                runnable = conn.execute('''
+                    SELECT COUNT(*) FROM jobs
+                    WHERE (status = 'running' AND owner = ?) OR (status = 'pending' AND available_at <= ?)
+                ''', (self.owner, time.time())).fetchone()[0]
+            if not runnable and not self._unwritten:
+                break
+            time.sleep(0.05)
+        self._stop.set()
+        for worker in self._workers:
+            worker.join(max(0.0, deadline - time.monotonic()) + 1)
+        # Write the acknowledgements of jobs that just finished, then hand back the ones still running
+        # here instead of leaving them to wait out their lease
+        self._flush_writes(deadline + 1)
+        self._release()
+
+    def _flush_writes(self, deadline):
+        try:
+            self.db.flush_writes(max(0.0, deadline - time.monotonic()))
+        except Exception:
+            pass  # Already reported by the write-behind queue; the affected jobs are retried
@@ -0,0 +1,205 @@
+"""
+Asyncio LLM gateway for Second Brain Assistant
+Every Gemini call goes through one gateway that bounds concurrency, applies
+request/token rate limits with priority ordering, retries transient errors
+with backoff, applies per-call deadlines and supports cancellation, with sync
+wrappers so existing (threaded) callers keep working. Identical prompts that
+are already in flight are coalesced onto one call
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    LLM_MAX_CONCURRENCY, LLM_TIMEOUT, LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE,
+    LLM_MAX_RETRIES, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX
+)
+from rate_limiter import (
+    CallScheduler, PRIORITY_INTERACTIVE, estimate_tokens, is_retryable, is_quota_error, backoff_delay
+)
+from response_cache import make_cache_key
+from singleflight import SingleFlight
+from metrics import metrics
+
+
+def response_text(response):
+    """Extract the text from a Gemini response or streamed chunk"""
+    return response.text if hasattr(response, 'text') else response.candidates[0].content.parts[0].text
+
+
+class LLMGateway:
+    """Runs model calls on a private event loop with shared concurrency, rate and retry policies"""
+
+    def __init__(self, model, max_concurrency=LLM_MAX_CONCURRENCY, timeout=LLM_TIMEOUT,
+                 requests_per_minute=LLM_REQUESTS_PER_MINUTE, tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+                 max_retries=LLM_MAX_RETRIES):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.flights = SingleFlight()
+        # Blocking SDK calls run here; its size is the hard cap on calls actually in flight
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-gateway", daemon=True)
+        self._thread.start()
+        self.scheduler = CallScheduler(max_concurrency, requests_per_minute, tokens_per_minute)
+
+    def _call_model(self, prompt, timeout, kwargs):
+        request_options = {'timeout': timeout} if timeout else None
+        if request_options:
+            kwargs = {**kwargs, 'request_options': request_options}
+        return response_text(self.model.generate_content(prompt, **kwargs))
+
+    async def _generate(self, prompt, timeout, priority, kwargs):
+        tokens = estimate_tokens(prompt)
+        for attempt in range(self.max_retries + 1):
+            await self.scheduler.acquire(priority, tokens)
+            try:
+                return await self._loop.run_in_executor(self._executor, self._call_model, prompt, timeout, kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                if is_quota_error(e):
+                    self.scheduler.penalize()
+                self.scheduler.record_retry()
+            finally:
+                self.scheduler.release()
+            # The overall deadline (wait_for in submit) still bounds the total time spent retrying
+            await asyncio.sleep(backoff_delay(attempt, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX))
+
+    async def generate(self, prompt, timeout=None, priority=PRIORITY_INTERACTIVE, site=None, **kwargs):
+        """Generate text for a prompt; raises TimeoutError if it does not finish within the deadline"""
+        # Always scheduled on the gateway loop (even when awaited from another loop) so the scheduler
+        # and in-flight coalescing are shared by every caller
+        return await asyncio.wrap_future(self.submit(prompt, timeout=timeout, priority=priority, site=site, **kwargs))
+
+    async def generate_many(self, prompts, timeout=None, priority=PRIORITY_INTERACTIVE, site=None, **kwargs):
+        """Generate all prompts concurrently; failed calls come back as exception objects"""
+        return await asyncio.gather(
+            *(self.generate(prompt, timeout=timeout, priority=priority, site=site, **kwargs) for prompt in prompts),
+            return_exceptions=True
+        )
+
+    def submit(self, prompt, timeout=None, priority=PRIORITY_INTERACTIVE, site=None, **kwargs):
+        """
+        Start a call from synchronous code and return a concurrent.futures.Future (cancel() to abandon it).
+        Use PRIORITY_BACKGROUND for work the user is not waiting on so chat turns are admitted first.
+        If the same prompt is already in flight the caller joins that call instead of starting another.
+        site names the caller in the call metrics (e.g. 'split_into_questions').
+        """
+        timeout = self.timeout if timeout is None else timeout
+        key = make_cache_key('llm', prompt, repr(sorted(kwargs.items())))
+        started = time.monotonic()
+        future = self.flights.submit(key, lambda: asyncio.run_coroutine_threadsafe(
+            asyncio.wait_for(self._generate(prompt, timeout, priority, kwargs), timeout), self._loop
+        ))
+        if future.coalesced:
+            metrics.record_cache(site, 'coalesced')
+        future.add_done_callback(lambda done: self._record(site, started, prompt, done))
+        return future
+
+    def _record(self, site, started, prompt, future):
+        if future.cancelled():
+            error, response = 'Cancelled', ''
+        elif future.exception() is not None:
+            error, response = type(future.exception()).__name__, ''
+        else:
+            error, response = None, future.result()
+        metrics.record_call(
+            site, time.monotonic() - started, len(prompt.encode('utf-8')), len((response or '').encode('utf-8')), error
+        )
+
+    def generate_sync(self, prompt, timeout=None, priority=PRIORITY_INTERACTIVE, site=None, **kwargs):
+        """Blocking wrapper around generate() for existing synchronous callers"""
+        return self.submit(prompt, timeout=timeout, priority=priority, site=site, **kwargs).result()
+
+    def generate_many_sync(self, prompts, timeout=None, priority=PRIORITY_INTERACTIVE, site=None, **kwargs):
+        """Blocking wrapper around generate_many()"""
+        futures = [self.submit(prompt, timeout=timeout, priority=priority, site=site, **kwargs) for prompt in prompts]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def stream_sync(self, prompt, timeout=None, priority=PRIORITY_INTERACTIVE, site=None, **kwargs):
+        """Yield streamed text chunks while holding one of the gateway's slots (streams are never coalesced)"""
+        timeout = self.timeout if timeout is None else timeout
+        request_options = {'timeout': timeout} if timeout else None
+        if request_options:
+            kwargs = {**kwargs, 'request_options': request_options}
+        tokens = estimate_tokens(prompt)
+        started_at = time.monotonic()
+        response_bytes = 0
+        error = None
+        try:
+            for attempt in range(self.max_retries + 1):
+                asyncio.run_coroutine_threadsafe(
+                    asyncio.wait_for(self.scheduler.acquire(priority, tokens), timeout), self._loop
+                ).result()
+                started = False
+                try:
+                    for chunk in self.model.generate_content(prompt, stream=True, **kwargs):
+                        text = response_text(chunk)
+                        if text:
+                            started = True
+                            response_bytes += len(text.encode('utf-8'))
+                            yield text
+                    return
+                except Exception as e:
+                    # Once text has been shown a retry would repeat it, so only retry before the first chunk
+                    if started or attempt >= self.max_retries or not is_retryable(e):
+                        raise
+                    if is_quota_error(e):
+                        self._loop.call_soon_threadsafe(self.scheduler.penalize)
+                    # The scheduler is only touched on the loop thread, like penalize and release
+                    self._loop.call_soon_threadsafe(self.scheduler.record_retry)
+                finally:
+                    self._loop.call_soon_threadsafe(self.scheduler.release)
+                time.sleep(backoff_delay(attempt, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX))
+        except BaseException as e:
+            error = 'Cancelled' if isinstance(e, GeneratorExit) else type(e).__name__
+            raise
+        finally:
+            metrics.record_call(site, time.monotonic() - started_at, len(prompt.encode('utf-8')), response_bytes, error)
+
+    def stats(self):
+        """Scheduler counters: active and queued calls, retries and quota throttles"""
+        return self.scheduler.stats()
+
+    async def _cancel_pending(self):
+        current = asyncio.current_task()
+        for task in asyncio.all_tasks():
+            if task is not current:
+                task.cancel()
+
+    def close(self):
+        """Cancel in-flight calls (their callers get CancelledError) and stop the gateway loop and worker threads"""
+        if self._loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(self._cancel_pending(), self._loop).result(timeout=5)
+            except Exception:
+                pass
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._executor.shutdown(wait=False)
+
+
+_gateways = {}
+_gateways_lock = threading.Lock()
+
+
+def as_gateway(model_or_gateway):
+    """Return a gateway for a raw model (one shared gateway per model) or pass a gateway through"""
+    if isinstance(model_or_gateway, LLMGateway):
+        return model_or_gateway
+    with _gateways_lock:
+        gateway = _gateways.get(id(model_or_gateway))
+        if gateway is None or gateway.model is not model_or_gateway:
+            gateway = LLMGateway(model_or_gateway)
+            _gateways[id(model_or_gateway)] = gateway
+        return gateway
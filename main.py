@@ -11,9 +11,15 @@ from rich.panel import Panel
 from rich.prompt import Prompt, Confirm
 from rich.table import Table
 from rich.text import Text
+from rich.live import Live
 from rich import print as rprint
 from ai_assistant import SecondBrainAssistant
+from metrics import metrics
+from config import STREAM_RESPONSES, SPLIT_QUESTION_WORKERS, SPLIT_QUESTION_TIMEOUT
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
+import time
+import json
 from langdetect import detect
 import re
 
@@ -21,6 +27,7 @@ class SecondBrainCLI:
     def __init__(self):
         self.console = Console()
         self.assistant = SecondBrainAssistant()
+        self.question_executor = ThreadPoolExecutor(max_workers=SPLIT_QUESTION_WORKERS, thread_name_prefix="question")
         self.running = True
 
     def detect_language_style(self, text):
@@ -70,6 +77,8 @@ class SecondBrainCLI:
             ("memory add <content>", "Add new memory"),
             ("/explain <topic>[; for X marks][; format: ...]", "Get a detailed explanation of a topic, optionally for marks or in a specific format"),
             ("/report <topic>", "Generate a comprehensive PDF report on any topic (with web search)"),
+            ("/report --fresh <topic>", "Regenerate every report section instead of reusing cached ones"),
+            ("stats [json|prometheus]", "Show call latency, size, error and cache statistics"),
             ("clear", "Clear the screen"),
             ("quit/exit", "Exit the application")
         ]
@@ -106,6 +115,26 @@ class SecondBrainCLI:
             return True
         return False
     
+    def handle_report(self, command):
+        """Handle /report with a spinner that shows which sections are written and laid out so far"""
+        if not command.strip().lower().startswith('/report'):
+            return False
+        status = self.console.status("[bold green]Planning report...")
+        status.start()
+        
+        def progress(event, section, done, total):
+            if event == 'generated':
+                status.update(f"[bold green]Writing report... {done}/{total} sections written")
+            elif event == 'rendered':
+                self.console.print(f"[dim]  ✓ {section} ({done}/{total})[/dim]")
+        
+        try:
+            result = self.assistant.handle_report_command(command, progress=progress)
+        finally:
+            status.stop()
+        self.console.print(result.strip())
+        return True
+    
     def _process_and_print(self, message):
         """Processes a single message and prints the assistant's response."""
         try:
@@ -120,10 +149,149 @@ class SecondBrainCLI:
             self.console.print(f"[red]Error processing message: {str(e)}[/red]")
             self.console.print("[yellow]I'm having trouble processing that. Could you try rephrasing?[yellow]")
 
+    def _response_chunks(self, user_input):
+        """Yield the assistant's answer to user_input, chunk by chunk when streaming is enabled"""
+        # Optimized processing - skip complex splitting for simple queries
+        if len(user_input.split()) <= 10 and ' and ' not in user_input.lower():
+            # Simple query - process directly
+            language_style = self.detect_language_style(user_input)
+            yield from self.assistant.stream_message(user_input, language_style=language_style, stream=STREAM_RESPONSES)
+            return
+        
+        # Complex query - use AI-powered splitter
+        questions = self.assistant.split_into_questions(user_input)
+        
+        # Check if we should create a unified response
+        if len(questions) > 1:
+            # Simplified decision making - combine if similar length
+            if len(questions) <= 2 and len(user_input) < 150:
+                # Create a unified response instead of separate ones
+                yield from self.assistant.stream_unified_response(user_input, questions, stream=STREAM_RESPONSES)
+            else:
+                # Process each question separately for distinct topics
+                yield from self._answer_questions(questions)
+        else:
+            # Single question - process normally
+            language_style = self.detect_language_style(user_input)
+            yield from self.assistant.stream_message(user_input, language_style=language_style, stream=STREAM_RESPONSES)
+    
+    def display_stats(self, command):
+        """Show call metrics as a table, or dump them as JSON or Prometheus text"""
+        parts = command.split()
+        fmt = parts[1].lower() if len(parts) > 1 else 'table'
+        if fmt == 'json':
+            self.console.print_json(json.dumps(self.assistant.get_stats(), default=str))
+            return
+        if fmt in ('prometheus', 'prom'):
+            self.console.print(metrics.to_prometheus(), markup=False, highlight=False, soft_wrap=True, end='')
+            return
+        
+        table = Table(title="Call Statistics")
+        table.add_column("Call site", style="cyan")
+        table.add_column("Calls", justify="right")
+        table.add_column("Errors", justify="right")
+        table.add_column("Mean (s)", justify="right")
+        table.add_column("p50 (s)", justify="right")
+        table.add_column("p95 (s)", justify="right")
+        table.add_column("Prompt KB", justify="right")
+        table.add_column("Response KB", justify="right")
+        table.add_column("Cache")
+        for site, site_stats in metrics.snapshot().items():
+            latency = site_stats['latency']
+            table.add_row(
+                site,
+                str(site_stats['calls']),
+                str(sum(site_stats['errors'].values())),
+                f"{latency['mean']:.2f}",
+                f"{latency['p50']:.2f}",
+                f"{latency['p95']:.2f}",
+                f"{site_stats['prompt_bytes'] / 1024:.1f}",
+                f"{site_stats['response_bytes'] / 1024:.1f}",
+                ', '.join(f"{outcome}={count}" for outcome, count in sorted(site_stats['cache'].items()))
+            )
+        self.console.print(table)
+        
+        stats = self.assistant.get_stats()
+        self.console.print(
+            f"[bold]LLM gateway:[/bold] {stats['llm']['active']} active, {stats['llm']['queued']} queued, "
+            f"{stats['llm']['retries']} retries, {stats['llm']['throttled']} throttled"
+        )
+        self.console.print(
+            f"[bold]Intent classifier:[/bold] {stats['intents']['total']} decisions, "
+            f"{stats['intents']['fallback_rate']:.0%} sent to the LLM"
+        )
+        self.console.print(
+            f"[bold]Response cache:[/bold] {stats['response_cache']['hit_rate']:.0%} hit rate, "
+            f"{stats['response_cache']['entries']} entries"
+        )
+        backlog = stats['jobs']['backlog']
+        self.console.print(
+            f"[bold]Background jobs:[/bold] {backlog.get('pending', 0) + backlog.get('running', 0)} waiting, "
+            f"{stats['jobs'].get('retried', 0)} retries, {backlog.get('failed', 0)} failed"
+        )
+    
+    def _answer_questions(self, questions):
+        """Answer questions concurrently and yield the answers in the original order as they become ready"""
+        started = time.monotonic()
+        # Language detection is not thread-safe, so do it up front
+        futures = [
+            self.question_executor.submit(
+                self.assistant.process_message, question, language_style=self.detect_language_style(question)
+            )
+            for question in questions
+        ]
+        first = True
+        for index, (question, future) in enumerate(zip(questions, futures)):
+            # Questions queued behind a full pool get a fresh timeout for each wave of workers
+            deadline = started + SPLIT_QUESTION_TIMEOUT * (index // SPLIT_QUESTION_WORKERS + 1)
+            try:
+                answer = future.result(timeout=max(0, deadline - time.monotonic())).strip()
+            except FutureTimeoutError:
+                future.cancel()
+                answer = f"(Sorry, answering \"{question}\" took too long, so I skipped it.)"
+            except Exception as e:
+                answer = f"(Sorry, I couldn't answer \"{question}\": {str(e)})"
+            if not answer:
+                continue
+            yield answer if first else "\n\n" + answer
+            first = False
+    
+    def _print_streamed(self, chunks):
+        """Show a spinner until the first chunk arrives, then render the answer live as it grows"""
+        text = Text.assemble(("Assistant", "bold green"), ": ")
+        status = self.console.status("[bold green]Thinking...")
+        status.start()
+        live = None
+        try:
+            for chunk in chunks:
+                if live is None:
+                    status.stop()
+                    chunk = chunk.lstrip()
+                    live = Live(text, console=self.console, refresh_per_second=15, vertical_overflow="visible")
+                    live.start()
+                text.append(chunk)
+                live.update(text)
+        finally:
+            status.stop()
+            if live is not None:
+                live.stop()
+                # Live only ends its line itself when attached to a terminal
+                if not self.console.is_terminal:
+                    self.console.line()
+    
     def run(self):
         """Main application loop"""
         self.display_welcome()
         
+        try:
+            self._run_loop()
+        finally:
+            self.question_executor.shutdown(wait=False, cancel_futures=True)
+            # Drain queued conversation and memory writes before exiting
+            self.assistant.shutdown()
+    
+    def _run_loop(self):
+        """Read and answer user input until the user quits"""
         while self.running:
             try:
                 # Get user input
@@ -151,10 +319,19 @@ class SecondBrainCLI:
                 #     self.voice_mode()
                 #     continue
                 
+                # Only the exact commands, so chat like "stats of india population" still gets an answer
+                elif ' '.join(user_input.lower().split()) in ['stats', 'stats json', 'stats prometheus', 'stats prom']:
+                    self.display_stats(user_input)
+                    continue
+                
                 # Handle search commands
                 if self.handle_search(user_input):
                     continue
                 
+                # Handle report commands with per-section progress
+                if self.handle_report(user_input):
+                    continue
+                
                 # Handle memory commands
                 if user_input.lower().startswith("memory"):
                     response = self.assistant._handle_memory_commands(user_input)
@@ -163,40 +340,7 @@ class SecondBrainCLI:
                 # Process user input
                 # Do not print the user's command
 
-                with self.console.status("[bold green]Thinking..."):
-                    # Optimized processing - skip complex splitting for simple queries
-                    if len(user_input.split()) <= 10 and ' and ' not in user_input.lower():
-                        # Simple query - process directly
-                        language_style = self.detect_language_style(user_input)
-                        final_response = self.assistant.process_message(user_input, language_style=language_style)
-                    else:
-                        # Complex query - use AI-powered splitter
-                        questions = self.assistant.split_into_questions(user_input)
-                        
-                        # Check if we should create a unified response
-                        if len(questions) > 1:
-                            # Simplified decision making - combine if similar length
-                            if len(questions) <= 2 and len(user_input) < 150:
-                                # Create a unified response instead of separate ones
-                                final_response = self.assistant.create_unified_response(user_input, questions)
-                            else:
-                                # Process each question separately for distinct topics
-                                responses = []
-                                for question in questions:
-                                    try:
-                                        language_style = self.detect_language_style(question)
-                                        response = self.assistant.process_message(question, language_style=language_style)
-                                        responses.append(response.strip())
-                                    except Exception as e:
-                                        self.console.print(f"[red]Error processing message: {str(e)}[/red]")
-                                        continue
-                                final_response = "\n\n".join(responses)
-                        else:
-                            # Single question - process normally
-                            language_style = self.detect_language_style(user_input)
-                            final_response = self.assistant.process_message(user_input, language_style=language_style)
-                        
-                    self.console.print(f"[bold green]Assistant[/bold green]: {final_response}")
+                self._print_streamed(self._response_chunks(user_input))
                 
             except KeyboardInterrupt:
                 self.console.print("\n[yellow]Goodbye! Thanks for using your Second Brain! 🧠[/yellow]")
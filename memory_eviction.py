@@ -0,0 +1,94 @@
+"""
+Memory eviction engine for Second Brain Assistant
+Keeps the memory table under MAX_MEMORY_ENTRIES by moving the lowest-value
+memories (by importance, age and access frequency) into memory_archive
+"""
+
+import threading
+from datetime import datetime
+from config import MAX_MEMORY_ENTRIES, MEMORY_EVICTION_INTERVAL, MEMORY_EVICTION_BATCH
+
+
+class MemoryEvictor:
+    """Background worker that trims the memory table a batch at a time"""
+
+    # Retention score weights: higher scores are kept longer
+    IMPORTANCE_WEIGHT = 10.0
+    ACCESS_WEIGHT = 2.0
+    ACCESS_CAP = 10
+    AGE_PENALTY_PER_DAY = 0.1
+
+    def __init__(self, db, max_entries=MAX_MEMORY_ENTRIES, interval=MEMORY_EVICTION_INTERVAL, batch_size=MEMORY_EVICTION_BATCH):
+        self.db = db
+        self.max_entries = max_entries
+        self.interval = interval
+        self.batch_size = batch_size
+        self.evicted_total = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="memory-evictor", daemon=True)
+        self._thread.start()
+
+    def score_sql(self):
+        """SQL expression for the retention score of a memory row"""
+        return f'''
+            importance * {self.IMPORTANCE_WEIGHT}
+            + MIN(COALESCE(access_count, 0), {self.ACCESS_CAP}) * {self.ACCESS_WEIGHT}
+            - COALESCE(julianday('now', 'localtime') - julianday(COALESCE(last_accessed, timestamp)), 0) * {self.AGE_PENALTY_PER_DAY}
+        '''
+
+    def notify(self):
+        """Ask the worker to check the table size soon (called after inserts)"""
+        self._wake.set()
+
+    def evict_once(self):
+        """Archive up to batch_size of the lowest scoring memories if over the limit; returns the number evicted"""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            # Take the write lock first so concurrent processes never pick the same rows
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('SELECT COUNT(*) FROM memory')
+            excess = cursor.fetchone()[0] - self.max_entries
+            if excess <= 0:
+                return 0
+
+            cursor.execute(f'''
+                SELECT id FROM memory
+                ORDER BY {self.score_sql()} ASC, id ASC
+                LIMIT ?
+            ''', (min(excess, self.batch_size),))
+            ids = [row[0] for row in cursor.fetchall()]
+            placeholders = ','.join('?' * len(ids))
+
+            cursor.execute(f'''
+                INSERT OR REPLACE INTO memory_archive
+                    (id, timestamp, content, category, importance, access_count, last_accessed, archived_at)
+                SELECT id, timestamp, content, category, importance, access_count, last_accessed, ?
+                FROM memory
+                WHERE id IN ({placeholders})
+            ''', [datetime.now().isoformat()] + ids)
+            cursor.execute(f'DELETE FROM memory WHERE id IN ({placeholders})', ids)
+
+        self.db.memory_index.remove_many(ids)
+        self.db.bump_write_version()
+        self.evicted_total += len(ids)
+        return len(ids)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                # Keep trimming in small batches until under the limit
+                while not self._stop.is_set() and self.evict_once() > 0:
+                    pass
+            except Exception as e:
+                print(f"Memory eviction failed: {str(e)}")
+
+    def close(self, timeout=None):
+        """Stop the background worker"""
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
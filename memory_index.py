@@ -0,0 +1,205 @@
+"""
+Semantic memory index for Second Brain Assistant
+Embeds memories with an offline hashed n-gram embedder and answers
+cosine top-k queries against a compact float32 matrix
+"""
+
+import os
+import re
+import tempfile
+import threading
+import zlib
+import numpy as np
+from config import MEMORY_INDEX_DIM, MEMORY_INDEX_SAVE_EVERY
+
+
+class HashedNgramEmbedder:
+    """Deterministic bag-of-features embedder: words plus character trigrams, hashed into a fixed dimension"""
+
+    def __init__(self, dim=MEMORY_INDEX_DIM):
+        self.dim = dim
+
+    def features(self, text):
+        """Yield the hashed features of a text"""
+        words = re.findall(r'\w+', text.lower())
+        for word in words:
+            yield f"w:{word}"
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                yield f"c:{padded[i:i + 3]}"
+        for first, second in zip(words, words[1:]):
+            yield f"b:{first} {second}"
+
+    def embed(self, text):
+        """Embed a single text into an L2-normalised float32 vector"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self.features(text):
+            # crc32 is stable across processes, unlike the salted built-in hash()
+            h = zlib.crc32(feature.encode('utf-8'))
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vector[h % self.dim] += sign
+        # Sublinear term frequency
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+
+class MemoryIndex:
+    """In-memory float32 matrix of memory embeddings, persisted next to the database"""
+
+    def __init__(self, db_path, dim=MEMORY_INDEX_DIM):
+        self.embedder = HashedNgramEmbedder(dim)
+        self.dim = dim
+        base = os.path.splitext(db_path)[0]
+        # Vectors and ids live in one file so they are always replaced together
+        self.path = f"{base}.memindex.npz"
+        self._legacy_paths = (f"{base}.memvec.npy", f"{base}.memids.npy")
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._size = 0
+        self._row_of = {}
+        self._pending_writes = 0
+        self._dirty = False
+        self.load()
+
+    def __len__(self):
+        return self._size
+
+    def load(self):
+        """Load the persisted index, ignoring a file that is unreadable or internally inconsistent"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                vectors = data['vectors']
+                ids = data['ids']
+        except (OSError, ValueError, KeyError):
+            return
+        if (vectors.ndim != 2 or vectors.shape[1] != self.dim or ids.ndim != 1
+                or len(vectors) != len(ids) or len(np.unique(ids)) != len(ids)):
+            return
+        with self._lock:
+            self._vectors = vectors.astype(np.float32, copy=False)
+            self._ids = ids.astype(np.int64, copy=False)
+            self._size = len(ids)
+            self._row_of = {int(memory_id): row for row, memory_id in enumerate(self._ids)}
+            self._dirty = False
+
+    def clear(self):
+        """Drop every embedding (used when the persisted index does not match the database)"""
+        with self._lock:
+            self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+            self._ids = np.zeros(0, dtype=np.int64)
+            self._size = 0
+            self._row_of = {}
+            self._dirty = True
+
+    def save(self):
+        """Atomically write the live rows of the index to disk, if anything changed since the last load or save"""
+        with self._lock:
+            if not self._dirty:
+                return
+            vectors = self._vectors[:self._size].copy()
+            ids = self._ids[:self._size].copy()
+            self._pending_writes = 0
+            self._dirty = False
+        # A unique temporary file per writer, then one rename, so a crash or another
+        # process saving at the same time never leaves a mixed or half-written index
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.path), suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, vectors=vectors, ids=ids)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        for legacy_path in self._legacy_paths:
+            if os.path.exists(legacy_path):
+                try:
+                    os.remove(legacy_path)
+                except OSError:
+                    pass
+
+    def _grow(self, needed):
+        """Grow the backing arrays geometrically so appends stay amortised O(1)"""
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+        vectors = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        ids = np.zeros(new_capacity, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        self._vectors, self._ids = vectors, ids
+
+    def add_many(self, items):
+        """Add or replace embeddings for (memory_id, content) pairs"""
+        embedded = [(int(memory_id), self.embedder.embed(content)) for memory_id, content in items]
+        if not embedded:
+            return
+        with self._lock:
+            self._grow(self._size + len(embedded))
+            for memory_id, vector in embedded:
+                row = self._row_of.get(memory_id)
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._row_of[memory_id] = row
+                    self._ids[row] = memory_id
+                self._vectors[row] = vector
+            self._pending_writes += len(embedded)
+            self._dirty = True
+            should_save = self._pending_writes >= MEMORY_INDEX_SAVE_EVERY
+        if should_save:
+            self.save()
+
+    def add(self, memory_id, content):
+        """Add or replace the embedding for a single memory"""
+        self.add_many([(memory_id, content)])
+
+    def remove_many(self, memory_ids):
+        """Remove embeddings by memory id, swapping the last row into each hole"""
+        with self._lock:
+            for memory_id in memory_ids:
+                row = self._row_of.pop(int(memory_id), None)
+                if row is None:
+                    continue
+                last = self._size - 1
+                if row != last:
+                    moved_id = int(self._ids[last])
+                    self._vectors[row] = self._vectors[last]
+                    self._ids[row] = moved_id
+                    self._row_of[moved_id] = row
+                self._size = last
+                self._pending_writes += 1
+                self._dirty = True
+
+    def remove(self, memory_id):
+        """Remove the embedding for a single memory"""
+        self.remove_many([memory_id])
+
+    def ids(self):
+        """Return the set of indexed memory ids"""
+        with self._lock:
+            return set(self._row_of)
+
+    def search(self, query, k=5, min_score=0.0):
+        """Return up to k (memory_id, cosine similarity) pairs, best first"""
+        query_vector = self.embedder.embed(query)
+        if not query_vector.any():
+            return []
+        with self._lock:
+            if self._size == 0:
+                return []
+            # Vectors are normalised, so the dot product is the cosine similarity
+            scores = self._vectors[:self._size] @ query_vector
+            ids = self._ids[:self._size]
+            k = min(k, self._size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(int(ids[i]), float(scores[i])) for i in top if scores[i] >= min_score]
@@ -0,0 +1,149 @@
+"""
+Call instrumentation for Second Brain Assistant
+Records, per call site, a latency histogram, prompt and response sizes,
+errors and cache outcomes, and exports them as JSON or Prometheus text
+"""
+
+import bisect
+import json
+import threading
+from collections import Counter
+
+# Upper bounds (seconds) of the latency histogram buckets; a final +Inf bucket is implied
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class CallSiteStats:
+    """Aggregates for one call site"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = Counter()
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.prompt_bytes = 0
+        self.response_bytes = 0
+        self.cache = Counter()
+
+    def observe(self, latency, prompt_bytes, response_bytes, error):
+        self.calls += 1
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+        self.prompt_bytes += prompt_bytes
+        self.response_bytes += response_bytes
+        if error:
+            self.errors[error] += 1
+
+    def quantile(self, q):
+        """Approximate latency quantile from the histogram (upper bound of the bucket it falls in)"""
+        if not self.calls:
+            return 0.0
+        rank = q * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS + (self.latency_max,), self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.latency_max)
+        return self.latency_max
+
+    def to_dict(self):
+        return {
+            'calls': self.calls,
+            'errors': dict(self.errors),
+            'latency': {
+                'sum': round(self.latency_sum, 4),
+                'mean': round(self.latency_sum / self.calls, 4) if self.calls else 0.0,
+                'p50': round(self.quantile(0.5), 4),
+                'p95': round(self.quantile(0.95), 4),
+                'max': round(self.latency_max, 4),
+                'buckets': dict(zip([str(bound) for bound in LATENCY_BUCKETS] + ['+Inf'], self.buckets)),
+            },
+            'prompt_bytes': self.prompt_bytes,
+            'response_bytes': self.response_bytes,
+            'cache': dict(self.cache),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe collection of CallSiteStats keyed by call site name"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sites = {}
+
+    def _site(self, site):
+        stats = self._sites.get(site)
+        if stats is None:
+            stats = self._sites[site] = CallSiteStats()
+        return stats
+
+    def record_call(self, site, latency, prompt_bytes=0, response_bytes=0, error=None):
+        """Record one completed model or search call"""
+        with self._lock:
+            self._site(site or 'unknown').observe(latency, prompt_bytes, response_bytes, error)
+
+    def record_cache(self, site, outcome):
+        """Record a cache outcome for a call site (hit, miss, semantic_hit, coalesced, ...)"""
+        with self._lock:
+            self._site(site or 'unknown').cache[outcome] += 1
+
+    def snapshot(self):
+        """All call sites as plain dicts, sorted by total time spent"""
+        with self._lock:
+            sites = {site: stats.to_dict() for site, stats in self._sites.items()}
+        return dict(sorted(sites.items(), key=lambda item: item[1]['latency']['sum'], reverse=True))
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self, prefix='second_brain'):
+        """Render all call sites in the Prometheus text exposition format"""
+        with self._lock:
+            sites = sorted(self._sites.items())
+            lines = [
+                f'# HELP {prefix}_call_latency_seconds Latency of model and search calls by call site',
+                f'# TYPE {prefix}_call_latency_seconds histogram',
+            ]
+            for site, stats in sites:
+                cumulative = 0
+                for bound, count in zip([str(bound) for bound in LATENCY_BUCKETS] + ['+Inf'], stats.buckets):
+                    cumulative += count
+                    lines.append(f'{prefix}_call_latency_seconds_bucket{{site="{site}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_call_latency_seconds_sum{{site="{site}"}} {stats.latency_sum:.6f}')
+                lines.append(f'{prefix}_call_latency_seconds_count{{site="{site}"}} {stats.calls}')
+            for name, attribute, help_text in (
+                ('prompt_bytes_total', 'prompt_bytes', 'Prompt bytes sent by call site'),
+                ('response_bytes_total', 'response_bytes', 'Response bytes received by call site'),
+            ):
+                lines.append(f'# HELP {prefix}_{name} {help_text}')
+                lines.append(f'# TYPE {prefix}_{name} counter')
+                for site, stats in sites:
+                    lines.append(f'{prefix}_{name}{{site="{site}"}} {getattr(stats, attribute)}')
+            lines.append(f'# HELP {prefix}_call_errors_total Failed calls by call site and error type')
+            lines.append(f'# TYPE {prefix}_call_errors_total counter')
+            for site, stats in sites:
+                for error, count in sorted(stats.errors.items()):
+                    lines.append(f'{prefix}_call_errors_total{{site="{site}",error="{error}"}} {count}')
+            lines.append(f'# HELP {prefix}_cache_total Cache outcomes by call site')
+            lines.append(f'# TYPE {prefix}_cache_total counter')
+            for site, stats in sites:
+                for outcome, count in sorted(stats.cache.items()):
+                    lines.append(f'{prefix}_cache_total{{site="{site}",outcome="{outcome}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, base_path):
+        """Write <base_path>.json and <base_path>.prom"""
+        with open(f"{base_path}.json", 'w', encoding='utf-8') as f:
+            f.write(self.to_json())
+        with open(f"{base_path}.prom", 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+
+    def reset(self):
+        with self._lock:
+            self._sites.clear()
+
+
+# Shared by the gateway, caches and search so one `stats` command sees every call site
+metrics = MetricsRegistry()
@@ -0,0 +1,204 @@
+"""
+Model backends for Second Brain Assistant
+Every backend exposes generate_content(prompt, stream=False, **kwargs) like
+genai.GenerativeModel, so the LLM gateway works with any of them:
+
+- gemini: the real Gemini API
+- stub:   deterministic offline answers with a configurable latency distribution
+- record: calls Gemini and appends every prompt/response pair to a JSONL file
+- replay: answers from a recording, falling back to the stub for unseen prompts
+"""
+
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from config import (
+    MODEL_BACKEND, MODEL_STUB_LATENCY, MODEL_STUB_SEED, MODEL_RECORDING_PATH, MODEL_REPLAY_LATENCY
+)
+
+_WORDS = (
+    "the a system memory answer idea process result example data model simple clear important "
+    "question people time way information knowledge value change energy learning research world "
+    "because therefore however often usually helps means shows explains works makes provides"
+).split()
+
+
+class ModelResponse:
+    """Minimal stand-in for a Gemini response or streamed chunk"""
+
+    def __init__(self, text):
+        self.text = text
+
+
+def prompt_key(prompt):
+    """Stable key for a prompt in recordings"""
+    return hashlib.sha256(str(prompt).encode('utf-8')).hexdigest()
+
+
+def parse_latency(spec):
+    """
+    Parse a latency distribution spec into a sampler taking a random.Random:
+    'fixed:0.5', 'uniform:0.2,1.5', 'normal:0.8,0.2', 'lognormal:-0.5,0.6' or 'exponential:0.7' (seconds)
+    """
+    name, _, args = (spec or 'fixed:0').partition(':')
+    values = [float(value) for value in args.split(',') if value.strip()] if args else []
+    name = name.strip().lower()
+    if name == 'fixed':
+        return lambda rng: values[0] if values else 0.0
+    if name == 'uniform':
+        return lambda rng: rng.uniform(values[0], values[1])
+    if name == 'normal':
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if name == 'lognormal':
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    if name in ('exponential', 'exp'):
+        return lambda rng: rng.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class StubModel:
+    """Deterministic offline model: the same prompt always gets the same answer and latency"""
+
+    def __init__(self, latency=MODEL_STUB_LATENCY, seed=MODEL_STUB_SEED):
+        self.sample_latency = parse_latency(latency)
+        self.seed = seed
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _rng(self, prompt):
+        return random.Random(f"{self.seed}:{prompt_key(prompt)}")
+
+    def respond(self, prompt, rng):
+        """Pick a plausible answer for the kind of prompt the app sends"""
+        lowered = prompt.lower()
+        if "respond with only 'yes' or 'no'" in lowered:
+            return 'no'
+        if "'time', 'date', or 'none'" in lowered:
+            return 'none'
+        if 'json' in lowered and '"sections"' in lowered:
+            # Report planning prompt: a small valid plan for the quoted request
+            quoted = re.findall(r'"([^"]{3,})"', prompt)
+            topic = quoted[0] if quoted else 'General Topic'
+            return json.dumps({
+                'content': topic, 'title': topic.title()[:60], 'custom_sections': [], 'user_specified_sections': False,
+                'sections': ['Introduction', 'Background', 'Key Concepts', 'Current Developments', 'Conclusion'],
+                'preview': f"A structured report on {topic}.", 'search_queries': [topic],
+            })
+        if 'json' in lowered and 'list' in lowered:
+            # Splitter and query expansion prompts: echo the quoted message as a one-item list
+            quoted = re.findall(r'"([^"]{3,})"', prompt)
+            return json.dumps([quoted[-1]] if quoted else [])
+        if 'json' in lowered:
+            return '{}'
+        sentences = []
+        for _ in range(rng.randint(2, 4)):
+            words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 16))]
+            sentences.append(' '.join(words).capitalize() + '.')
+        return ' '.join(sentences)
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+        rng = self._rng(prompt)
+        latency = self.sample_latency(rng)
+        text = self.respond(str(prompt), rng)
+        if not stream:
+            time.sleep(latency)
+            return ModelResponse(text)
+        return self._stream(text, latency)
+
+    def _stream(self, text, latency):
+        # Spend about a third of the latency before the first chunk, the rest spread across chunks
+        words = text.split(' ')
+        time.sleep(latency / 3)
+        per_chunk = (latency - latency / 3) / max(1, math.ceil(len(words) / 4))
+        for start in range(0, len(words), 4):
+            chunk = ' '.join(words[start:start + 4])
+            yield ModelResponse(chunk + (' ' if start + 4 < len(words) else ''))
+            time.sleep(per_chunk)
+
+
+class RecordingModel:
+    """Wraps a real model and appends each prompt, response and latency to a JSONL recording"""
+
+    def __init__(self, model, path=MODEL_RECORDING_PATH):
+        self.model = model
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _write(self, prompt, text, latency):
+        entry = {'key': prompt_key(prompt), 'prompt': str(prompt), 'response': text, 'latency': round(latency, 4)}
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        started = time.monotonic()
+        if not stream:
+            response = self.model.generate_content(prompt, **kwargs)
+            self._write(prompt, response.text, time.monotonic() - started)
+            return response
+        return self._stream(prompt, started, kwargs)
+
+    def _stream(self, prompt, started, kwargs):
+        parts = []
+        for chunk in self.model.generate_content(prompt, stream=True, **kwargs):
+            parts.append(chunk.text)
+            yield chunk
+        self._write(prompt, ''.join(parts), time.monotonic() - started)
+
+
+class ReplayModel:
+    """Answers prompts from a recording; unseen prompts go to the fallback model (or raise KeyError)"""
+
+    def __init__(self, path=MODEL_RECORDING_PATH, fallback=None, replay_latency=MODEL_REPLAY_LATENCY):
+        self.fallback = fallback
+        self.replay_latency = replay_latency
+        self.hits = 0
+        self.misses = 0
+        self._recording = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._recording[entry['key']] = entry
+        except FileNotFoundError:
+            print(f"No model recording at {path}; every prompt will use the fallback")
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        entry = self._recording.get(prompt_key(prompt))
+        if entry is None:
+            self.misses += 1
+            if self.fallback is None:
+                raise KeyError(f"Prompt not in recording: {str(prompt)[:80]!r}")
+            return self.fallback.generate_content(prompt, stream=stream, **kwargs)
+        self.hits += 1
+        if self.replay_latency:
+            time.sleep(entry.get('latency', 0))
+        if not stream:
+            return ModelResponse(entry['response'])
+        return iter([ModelResponse(entry['response'])])
+
+
+def create_model(model_name, api_key=None, backend=MODEL_BACKEND):
+    """Build the model backend selected by MODEL_BACKEND"""
+    backend = (backend or 'gemini').lower()
+    if backend == 'stub':
+        return StubModel()
+    if backend == 'replay':
+        return ReplayModel(fallback=StubModel())
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    model = genai.GenerativeModel(model_name)
+    if backend == 'record':
+        return RecordingModel(model)
+    if backend != 'gemini':
+        raise ValueError(f"Unknown MODEL_BACKEND: {backend}")
+    return model
@@ -0,0 +1,148 @@
+"""
+Rate limiting for Second Brain Assistant model calls
+Token buckets for requests and tokens per minute, a priority-ordered
+admission queue so interactive chat goes ahead of background report work,
+and exponential backoff with jitter for retryable API errors.
+Everything here runs on the LLM gateway's event loop.
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import re
+import time
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+_RETRYABLE_NAMES = {
+    'ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable', 'InternalServerError',
+    'DeadlineExceeded', 'GatewayTimeout', 'BadGateway', 'Aborted',
+}
+_RETRYABLE_MESSAGE = re.compile(r'\b(429|500|502|503|504)\b|quota|rate limit|resource.?exhausted|unavailable|overloaded|try again', re.I)
+_QUOTA_MESSAGE = re.compile(r'\b429\b|quota|rate limit|resource.?exhausted', re.I)
+
+
+def estimate_tokens(text):
+    """Rough token count for budgeting (about four characters per token)"""
+    return len(text or '') // 4 + 1
+
+
+def is_retryable(error):
+    """True for quota, overload and transient server errors worth retrying"""
+    if type(error).__name__ in _RETRYABLE_NAMES:
+        return True
+    return bool(_RETRYABLE_MESSAGE.search(str(error)))
+
+
+def is_quota_error(error):
+    """True when the API says we are over our rate or quota"""
+    return type(error).__name__ in ('ResourceExhausted', 'TooManyRequests') or bool(_QUOTA_MESSAGE.search(str(error)))
+
+
+def backoff_delay(attempt, base, cap):
+    """Full-jitter exponential backoff: a random delay up to min(cap, base * 2**attempt)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """Refills continuously at per_minute / 60 per second up to a burst capacity"""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until amount tokens are available (0 if they are available now)"""
+        self._refill()
+        # A request larger than the whole bucket is let through once the bucket is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate if self.rate > 0 else float('inf')
+
+    def consume(self, amount):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def drain(self):
+        """Empty the bucket, e.g. after the server reports we are over quota"""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+class CallScheduler:
+    """Admits model calls in priority order once a concurrency slot and rate budget are free"""
+
+    def __init__(self, max_concurrency, requests_per_minute, tokens_per_minute):
+        self.max_concurrency = max_concurrency
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.active = 0
+        self.retries = 0
+        self.throttled = 0
+        self._waiters = []  # heap of (priority, sequence, tokens, future)
+        self._sequence = itertools.count()
+        self._timer = None
+
+    async def acquire(self, priority, tokens):
+        """Wait for admission; every successful acquire must be paired with release()"""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), tokens, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Admitted in the same tick we were cancelled: hand the slot back
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        self.active -= 1
+        self._dispatch()
+
+    def record_retry(self):
+        self.retries += 1
+
+    def penalize(self):
+        """Back off everyone after a quota error by emptying the request bucket"""
+        self.throttled += 1
+        self.requests.drain()
+
+    def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiters and self.active < self.max_concurrency:
+            priority, _, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            # The head waiter is served first, so lower priority work never jumps the queue
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if wait > 0:
+                self._timer = loop.call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+            self.active += 1
+            future.set_result(None)
+
+    def stats(self):
+        return {
+            'active': self.active,
+            'queued': sum(1 for waiter in self._waiters if not waiter[3].done()),
+            'retries': self.retries,
+            'throttled': self.throttled,
+        }
@@ -17,7 +17,64 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib import colors
 import textwrap
+import json
+import re
 from google_search import advanced_web_search
+from rate_limiter import PRIORITY_BACKGROUND
+from concurrent.futures import ThreadPoolExecutor
+from stage_graph import StageGraph
+import time
+import threading
+from config import (
+    REPORT_SECTION_WORKERS, REPORT_SECTION_TIMEOUT, REPORT_SECTION_RETRIES, REPORT_SECTION_CACHE_TTL, REPORT_PROGRESSIVE
+)
+from response_cache import make_cache_key
+from metrics import metrics
+
+# Bump when the section prompt or cache key changes so sections cached under the old one are not reused
+SECTION_PROMPT_VERSION = 2
+
+_TOPIC_FILLERS = {'a', 'an', 'the', 'on', 'about', 'of', 'for', 'and', 'in', 'to', 'into', 'regarding', 'report'}
+
+
+def normalize_topic(topic):
+    """Case-, punctuation- and filler-insensitive form of a topic for cache keys"""
+    # Word order and repeats are kept: "India exports to China" and "China exports to India" are different reports
+    words = re.findall(r'[a-z0-9]+', (topic or '').lower())
+    return ' '.join(word for word in words if word not in _TOPIC_FILLERS)
+
+
+def split_report_command(user_request):
+    """Strip the /report prefix and the --fresh flag; returns (request text, fresh)"""
+    request = user_request.strip()
+    if request.lower().startswith('/report'):
+        request = request[len('/report'):]
+    fresh = bool(re.search(r'(^|\s)--fresh\b', request, re.IGNORECASE))
+    return re.sub(r'(^|\s)--fresh\b', ' ', request, flags=re.IGNORECASE).strip(), fresh
+
+
+class SectionStream(list):
+    """
+    Flowable list for doc.build that refills itself one section at a time. ReportLab consumes
+    flowables from the front of the list, so pages are laid out as each section arrives and
+    drawn flowables are released instead of the whole report being held in memory.
+    """
+
+    def __init__(self, flowables, next_batch):
+        super().__init__(flowables)
+        self._next_batch = next_batch  # returns the next section's flowables, or None when done
+        self._finished = False
+
+    def __len__(self):
+        # doc.build loops while len(flowables) is non-zero, so this is where the next section is waited for
+        while not self._finished and not super().__len__():
+            batch = self._next_batch()
+            if batch is None:
+                self._finished = True
+            else:
+                self.extend(batch)
+        return super().__len__()
+
 
 class PDFReportGenerator:
     def __init__(self):
@@ -129,10 +186,11 @@ class PDFReportGenerator:
         story.append(Spacer(1, 0.5*inch))
         story.append(PageBreak())
 
-    def parse_report_request(self, user_request, ai_assistant):
+    def parse_report_request(self, user_request, ai_assistant, fresh=False):
         """Parse the user's report request and extract requirements with intelligent understanding"""
-        # Remove the /report prefix
-        request = user_request[len('/report'):].strip()
+        # Remove the /report prefix; --fresh (or fresh=True) regenerates every section instead of reusing cached ones
+        request, flagged = split_report_command(user_request)
+        fresh = fresh or flagged
         
         # Default professional report structure
         report_data = {
@@ -144,37 +202,153 @@ class PDFReportGenerator:
             'topic_only': True,
             'custom_sections': [],
             'filename': 'report',
-            'user_specified_sections': False
+            'user_specified_sections': False,
+            'fresh': fresh
         }
         
-        # Use AI to intelligently parse the user's request
-        parsed_request = self.intelligent_request_parser(request, ai_assistant)
-        
-        # Update report data with parsed information
-        report_data.update(parsed_request)
-        
-        # Use AI to intelligently summarize the description for a concise topic name
-        report_data['title'] = self.generate_topic_title(parsed_request['content'], ai_assistant)
+        # One structured planning call covers parsing, title, sections, preview and search hints
+        plan = self.plan_report(request, ai_assistant)
+        if plan:
+            report_data.update(plan)
+        else:
+            # Fall back to the separate parsing, title and section calls
+            self.parse_report_request_stepwise(request, report_data, ai_assistant)
         
         # Create a clean filename from title (without "Report" suffix)
         clean_title = report_data['title'].replace(' Report', '').replace(' Analysis', '').replace(' Study', '').replace(' Research', '')
         report_data['filename'] = clean_title.lower().replace(' ', '_').replace('/', '_').replace('\\', '_')
         report_data['filename'] = ''.join(c for c in report_data['filename'] if c.isalnum() or c in ('_', '-'))
         
-        # Generate sections based on user request - always include additional relevant sections
-        if report_data['user_specified_sections'] and report_data['custom_sections']:
-            # User mentioned specific sections - include them plus other relevant ones
-            report_data['sections'] = self.generate_comprehensive_sections(
-                parsed_request['content'], 
-                report_data['custom_sections'], 
-                ai_assistant
-            )
-        else:
-            # No specific sections mentioned - generate all appropriate sections
-            report_data['sections'] = self.generate_intelligent_sections(parsed_request['content'], ai_assistant)
-        
         return report_data
 
+    def plan_report(self, request, ai_assistant):
+        """Plan the whole report (topic, title, sections, preview, search hints) in one JSON call; None if unusable"""
+        planning_prompt = f"""
+        You are an expert report planner. Analyze the following report request and plan the complete report.
+        
+        User Request: "{request}"
+        
+        Instructions:
+        1. Identify the main topic/subject for the report
+        2. Note any specific sections the user asked for (e.g., "sections on education and achievements")
+        3. Create a concise, professional title (maximum 8 words, title case, without words like "Report", "Analysis" or "Study")
+        4. Plan 4-10 specific section headings: include every section the user asked for plus other relevant ones,
+           with "Introduction" first and "Conclusion" last
+        5. Write a 2-3 sentence preview of what the report will contain and what type of report it is
+        6. Suggest 1-3 web search queries that would find current information for the report
+        
+        Respond with a JSON object exactly like:
+        {{
+            "content": "main topic/subject extracted from the request",
+            "title": "Concise Title",
+            "custom_sections": ["sections the user explicitly asked for, if any"],
+            "user_specified_sections": true/false,
+            "sections": ["Introduction", "...", "Conclusion"],
+            "preview": "2-3 sentence summary of the report",
+            "search_queries": ["web search query"]
+        }}
+        
+        Return only the JSON object, no other text:
+        """
+        
+        try:
+            text = ai_assistant.llm.generate_sync(planning_prompt, priority=PRIORITY_BACKGROUND, site="plan_report")
+            json_match = re.search(r'\{.*\}', text, re.DOTALL)
+            if not json_match:
+                return None
+            return self.validate_report_plan(json.loads(json_match.group(0)), request)
+        except Exception as e:
+            return None
+
+    def validate_report_plan(self, plan, request):
+        """Check and normalise a planning response; returns report_data fields or None if it is unusable"""
+        if not isinstance(plan, dict):
+            return None
+        title = plan.get('title')
+        sections = plan.get('sections')
+        if not isinstance(title, str) or not title.strip() or len(title.split()) > 12:
+            return None
+        if not isinstance(sections, list) or not all(isinstance(section, str) for section in sections):
+            return None
+        
+        custom_sections = plan.get('custom_sections')
+        if not isinstance(custom_sections, list):
+            custom_sections = []
+        custom_sections = [section.strip() for section in custom_sections if isinstance(section, str) and section.strip()]
+        
+        # Drop blanks, numbering and duplicates, keeping the planned order
+        cleaned = []
+        for section in sections:
+            section = section.strip().lstrip('0123456789.-*# ').strip()
+            if section and section not in cleaned:
+                cleaned.append(section)
+        cleaned = [section for section in cleaned if section not in ('Introduction', 'Conclusion')]
+        
+        # Sections the user asked for always survive the 8-section limit, so they go first
+        requested = []
+        for section in custom_sections:
+            if section in ('Introduction', 'Conclusion') or section.lower() in [s.lower() for s in requested]:
+                continue
+            planned = [s for s in cleaned if s.lower() == section.lower()]
+            requested.append(planned[0] if planned else section)
+        if len(requested) > 8:
+            return None
+        cleaned = requested + [s for s in cleaned if s.lower() not in [r.lower() for r in requested]]
+        cleaned = cleaned[:8]
+        if len(cleaned) < 2:
+            return None
+        sections = ['Introduction'] + cleaned + ['Conclusion']
+        
+        title = title.strip().strip('"')
+        # Add "Report" suffix if not already present (as generate_topic_title does)
+        if not any(word in title.lower() for word in ['report', 'analysis', 'study', 'research']):
+            title += ' Report'
+        
+        search_queries = plan.get('search_queries')
+        if not isinstance(search_queries, list):
+            search_queries = []
+        preview = plan.get('preview')
+        content = plan.get('content')
+        
+        return {
+            'content': content.strip() if isinstance(content, str) and content.strip() else request,
+            'title': title,
+            'sections': sections,
+            'custom_sections': custom_sections,
+            'user_specified_sections': bool(plan.get('user_specified_sections')) and bool(custom_sections),
+            'preview': preview.strip() if isinstance(preview, str) else '',
+            'search_queries': [query.strip() for query in search_queries if isinstance(query, str) and query.strip()][:3],
+        }
+
+    def parse_report_request_stepwise(self, request, report_data, ai_assistant):
+        """Fill report_data with separate parsing, title and section calls (used when planning fails)"""
+        # Use AI to intelligently parse the user's request
+        parsed_request = self.intelligent_request_parser(request, ai_assistant)
+        
+        # Update report data with parsed information
+        report_data.update(parsed_request)
+        
+        # Title and sections both depend only on the parsed topic, so generate them concurrently
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            # Use AI to intelligently summarize the description for a concise topic name
+            title_future = executor.submit(self.generate_topic_title, parsed_request['content'], ai_assistant)
+            
+            # Generate sections based on user request - always include additional relevant sections
+            if report_data['user_specified_sections'] and report_data['custom_sections']:
+                # User mentioned specific sections - include them plus other relevant ones
+                sections_future = executor.submit(
+                    self.generate_comprehensive_sections,
+                    parsed_request['content'], 
+                    report_data['custom_sections'], 
+                    ai_assistant
+                )
+            else:
+                # No specific sections mentioned - generate all appropriate sections
+                sections_future = executor.submit(self.generate_intelligent_sections, parsed_request['content'], ai_assistant)
+            
+            report_data['title'] = title_future.result()
+            report_data['sections'] = sections_future.result()
+
     def intelligent_request_parser(self, request, ai_assistant):
         """Use AI to intelligently parse the user's report request"""
         parsing_prompt = f"""
@@ -209,8 +383,7 @@ class PDFReportGenerator:
         """
         
         try:
-            response = ai_assistant.model.generate_content(parsing_prompt)
-            text = response.text if hasattr(response, 'text') else response.candidates[0].content.parts[0].text
+            text = ai_assistant.llm.generate_sync(parsing_prompt, priority=PRIORITY_BACKGROUND, site="intelligent_request_parser")
             
             # Extract JSON from response
             import json
@@ -334,8 +507,7 @@ class PDFReportGenerator:
         """
         
         try:
-            response = ai_assistant.model.generate_content(comprehensive_prompt)
-            text = response.text if hasattr(response, 'text') else response.candidates[0].content.parts[0].text
+            text = ai_assistant.llm.generate_sync(comprehensive_prompt, priority=PRIORITY_BACKGROUND, site="generate_comprehensive_sections")
             
             # Parse the response to extract section headings
             sections = []
@@ -444,10 +616,9 @@ class PDFReportGenerator:
         """
         
         try:
-            response = ai_assistant.model.generate_content(sections_prompt)
+            text = ai_assistant.llm.generate_sync(sections_prompt, priority=PRIORITY_BACKGROUND, site="generate_intelligent_sections")
             
             # Parse the response to extract section headings
-            text = response.text if hasattr(response, 'text') else response.candidates[0].content.parts[0].text
             sections = []
             for line in text.strip().split('\n'):
                 section = line.strip()
@@ -524,8 +695,7 @@ class PDFReportGenerator:
         """
         
         try:
-            response = ai_assistant.model.generate_content(title_prompt)
-            title = response.text if hasattr(response, 'text') else response.candidates[0].content.parts[0].text
+            title = ai_assistant.llm.generate_sync(title_prompt, priority=PRIORITY_BACKGROUND, site="generate_topic_title")
             title = title.strip()
             
             # Add "Report" suffix if not already present
@@ -543,35 +713,54 @@ class PDFReportGenerator:
 
     def get_current_information(self, topic, ai_assistant):
         """Get current information about the topic using advanced web search"""
+        return self.search_current_information(topic, ai_assistant)[0]
+
+    def search_current_information(self, topic, ai_assistant):
+        """Web search for the topic; returns (prompt text, sorted [link, title] pairs of the results used)"""
         try:
             # Use advanced web search for best results
-            search_results = advanced_web_search(topic, ai_assistant.model, num_results=3)
+            search_results = advanced_web_search(topic, ai_assistant.llm, num_results=3)
             if search_results:
                 search_info = "\n\nCurrent Information from Web Search:\n"
                 for item in search_results:
                     summary = item.get('enriched_snippet') or item.get('snippet') or ''
                     search_info += f"\n• {item.get('title', 'No title')}\n  {summary}\n  Source: {item.get('link', 'No link')}\n"
-                return search_info
+                sources = sorted([item.get('link') or '', (item.get('title') or '').strip()] for item in search_results)
+                return search_info, sources
             else:
-                return "\n\nNote: Unable to retrieve current web information at this time."
+                return "\n\nNote: Unable to retrieve current web information at this time.", []
         except Exception as e:
-            return f"\n\nNote: Web search unavailable ({str(e)}). Report based on general knowledge."
+            return f"\n\nNote: Web search unavailable ({str(e)}). Report based on general knowledge.", []
 
-    def generate_report_content(self, report_data, ai_assistant):
-        """Generate detailed report content using AI assistant with web search"""
-        
-        # Get current information from web search
-        current_info = ""
-        if report_data.get('topic_only', False):
+    def search_report_context(self, report_data, ai_assistant):
+        """Search the web for current information the report should draw on; stored in report_data['search_context']"""
+        current_info, sources = "", []
+        if report_data.get('search_queries'):
+            # The planner already suggested what to search for
+            current_info, sources = self.search_current_information(report_data['search_queries'][0], ai_assistant)
+        elif report_data.get('topic_only', False):
             # For topic-only requests, always search for current information
-            current_info = self.get_current_information(report_data['content'], ai_assistant)
+            current_info, sources = self.search_current_information(report_data['content'], ai_assistant)
         else:
             # For structured requests, search if the content suggests current/recent information is needed
             search_keywords = ['current', 'recent', 'latest', 'update', 'today', '2024', '2025', 'now']
             if any(keyword in report_data['content'].lower() for keyword in search_keywords):
                 # Extract main topic for search
                 topic = report_data['content'][:100]  # First 100 chars as topic
-                current_info = self.get_current_information(topic, ai_assistant)
+                current_info, sources = self.search_current_information(topic, ai_assistant)
+        
+        report_data['search_context'] = current_info
+        # The snippets are rewritten by the model on every search, so only the sources identify the context
+        report_data['search_sources'] = sources
+        return current_info
+
+    def generate_report_content(self, report_data, ai_assistant):
+        """Generate detailed report content using AI assistant with web search"""
+        
+        # Get current information from web search
+        current_info = report_data.get('search_context')
+        if current_info is None:
+            current_info = self.search_report_context(report_data, ai_assistant)
         
         # Enhanced content prompt
         content_prompt = f"""
@@ -602,21 +791,56 @@ class PDFReportGenerator:
         """
         
         try:
-            response = ai_assistant.model.generate_content(content_prompt)
-            text = response.text if hasattr(response, 'text') else response.candidates[0].content.parts[0].text
+            text = ai_assistant.llm.generate_sync(content_prompt, priority=PRIORITY_BACKGROUND, site="generate_report_content")
             return text.strip()
         except Exception as e:
             return f"Error generating report content: {str(e)}"
 
-    def generate_section_content(self, report_data, ai_assistant, detailed_content):
-        """Generate content for each section of the report"""
-        section_contents = {}
-        
-        for section_name in report_data['sections']:
-            section_prompt = f"""
+    def generate_section_content(self, report_data, ai_assistant):
+        """
+        Generate content for every section concurrently (at most REPORT_SECTION_WORKERS at once).
+        Results are stored in report_data['section_results'] in section order, one dict per section
+        with its content, status, attempts, seconds and whether it came from the section cache;
+        returns {section name: content}. Cached sections are reused unless report_data['fresh'] is set.
+        """
+        sections = report_data['sections']
+        if not sections:
+            report_data['section_results'] = []
+            return {}
+        
+        with ThreadPoolExecutor(max_workers=min(REPORT_SECTION_WORKERS, len(sections))) as executor:
+            futures = [executor.submit(self.generate_one_section, report_data, section_name, ai_assistant)
+                       for section_name in sections]
+            # Collected in submission order, so the report order never depends on which call finished first
+            report_data['section_results'] = [future.result() for future in futures]
+        
+        return {result['section']: result['content'] for result in report_data['section_results']}
+
+    def section_cache_parts(self, report_data, section_name):
+        """Section cache key parts: normalized topic, section name, prompt version and a hash of the search sources"""
+        return (
+            normalize_topic(report_data['content']),
+            section_name.strip().lower(),
+            SECTION_PROMPT_VERSION,
+            make_cache_key('search_sources', report_data.get('search_sources', [])),
+        )
+
+    def generate_one_section(self, report_data, section_name, ai_assistant,
+                             timeout=REPORT_SECTION_TIMEOUT, retries=REPORT_SECTION_RETRIES):
+        """Generate one section (or reuse a cached one), retrying a timed-out or failed call; never raises"""
+        cache_parts = self.section_cache_parts(report_data, section_name)
+        if not report_data.get('fresh'):
+            cached = ai_assistant.response_cache.get('report_section', *cache_parts)
+            metrics.record_cache('generate_section_content', 'hit' if cached else 'miss')
+            if cached:
+                return {'section': section_name, 'content': cached, 'status': 'ok',
+                        'attempts': 0, 'seconds': 0.0, 'cached': True}
+        
+        section_prompt = f"""
             Create detailed content for the '{section_name}' section of a professional report.
             
             Topic/Subject: {report_data['content']}
+            {report_data.get('search_context', '')}
             
             Instructions for '{section_name}' section:
             - Write 2-3 well-structured paragraphs
@@ -626,22 +850,29 @@ class PDFReportGenerator:
             - Ensure content is appropriate for this section type
             - DO NOT repeat the topic name or title - focus on substantive content
             - Write as if this will appear under the '{section_name}' heading
+            - If current web information is provided above, use what is relevant to this section
             
             Content for {section_name}:
             """
-            
+        
+        started = time.monotonic()
+        error = None
+        for attempt in range(1, retries + 2):
             try:
-                response = ai_assistant.model.generate_content(section_prompt)
-                text = response.text if hasattr(response, 'text') else response.candidates[0].content.parts[0].text
-                section_contents[section_name] = text.strip()
+                text = ai_assistant.llm.generate_sync(section_prompt, timeout=timeout, priority=PRIORITY_BACKGROUND,
+                                                      site="generate_section_content").strip()
+                if text:
+                    ai_assistant.response_cache.set('report_section', *cache_parts, value=text, ttl=REPORT_SECTION_CACHE_TTL)
+                return {'section': section_name, 'content': text, 'status': 'ok',
+                        'attempts': attempt, 'seconds': round(time.monotonic() - started, 3), 'cached': False}
             except Exception as e:
-                section_contents[section_name] = f"Error generating content for {section_name}: {str(e)}"
-        
-        return section_contents
+                error = str(e) or type(e).__name__
+        return {'section': section_name, 'content': f"Error generating content for {section_name}: {error}",
+                'status': 'failed', 'attempts': retries + 1, 'seconds': round(time.monotonic() - started, 3), 'cached': False}
 
-    def create_pdf_report(self, report_data, ai_assistant, output_path):
-        """Create the PDF report"""
-        doc = SimpleDocTemplate(
+    def create_document(self, report_data, output_path):
+        """A4 document template with the report's margins and title"""
+        return SimpleDocTemplate(
             output_path,
             pagesize=A4,
             rightMargin=72,
@@ -650,16 +881,12 @@ class PDFReportGenerator:
             bottomMargin=72,
             title=report_data['title']
         )
-        
-        # Story will hold all our content
-        story = []
-        
+
+    def create_front_matter(self, story, report_data):
+        """Add the title page and, if requested, the table of contents"""
         # Create professional title page
         self.create_title_page(story, report_data)
         
-        # Generate detailed content using AI
-        detailed_content = self.generate_report_content(report_data, ai_assistant)
-        
         # Table of Contents (if requested)
         if report_data.get('include_toc', True):
             # Add a formal heading for the Table of Contents
@@ -688,32 +915,98 @@ class PDFReportGenerator:
             
             story.append(toc_table)
             story.append(PageBreak())
+
+    def create_section_story(self, story, section_name, section_content, first=False):
+        """Add one section: a page break (except before the first), its heading and its paragraphs"""
+        # Start each section on a new page with a heading (except the first one)
+        if not first:  # Don't add PageBreak for the first section
+            story.append(PageBreak())
+        story.append(Paragraph(section_name, self.styles['SectionHeading']))
+        story.append(Spacer(1, 0.1*inch))
+        
+        # Process and add section content
+        paragraphs = section_content.split('\n\n')
+        for paragraph in paragraphs:
+            if paragraph.strip():
+                story.append(Paragraph(paragraph.strip(), self.styles['ReportBody']))
+                story.append(Spacer(1, 0.1*inch))
+
+    def create_pdf_report(self, report_data, ai_assistant, output_path):
+        """Create the PDF report"""
+        doc = self.create_document(report_data, output_path)
         
-        # Add main content sections
-        section_contents = self.generate_section_content(report_data, ai_assistant, detailed_content)
+        # Story will hold all our content
+        story = []
+        self.create_front_matter(story, report_data)
+        
+        # Add main content sections (generated here unless a caller already filled report_data['section_results'])
+        if 'section_results' not in report_data:
+            self.generate_section_content(report_data, ai_assistant)
+        section_contents = {result['section']: result['content'] for result in report_data['section_results']}
         
         for i, section_name in enumerate(report_data['sections']):
-            # Start each section on a new page with a heading (except the first one)
-            if i > 0:  # Don't add PageBreak for the first section
-                story.append(PageBreak())
-            story.append(Paragraph(section_name, self.styles['SectionHeading']))
-            story.append(Spacer(1, 0.1*inch))
-            
             # Get content for this section
             section_content = section_contents.get(section_name, f"Content for {section_name} section.")
-            
-            # Process and add section content
-            paragraphs = section_content.split('\n\n')
-            for paragraph in paragraphs:
-                if paragraph.strip():
-                    story.append(Paragraph(paragraph.strip(), self.styles['ReportBody']))
-                    story.append(Spacer(1, 0.1*inch))
+            self.create_section_story(story, section_name, section_content, first=(i == 0))
         
         # Build the PDF
         doc.build(story, onFirstPage=self.create_header_footer, onLaterPages=self.create_header_footer)
         
         return output_path
 
+    def create_pdf_report_progressive(self, report_data, ai_assistant, output_path, progress=None):
+        """
+        Generate sections concurrently and lay each one out as soon as it and every section before it
+        are ready, instead of waiting for all of them. progress(event, section, done, total) is called
+        with 'generated' as each section's text arrives and 'rendered' once its pages are laid out.
+        """
+        sections = report_data['sections']
+        total = len(sections)
+        generated = []
+        generated_lock = threading.Lock()
+        
+        def notify(event, section_name, done):
+            if progress:
+                try:
+                    progress(event, section_name, done, total)
+                except Exception:
+                    pass
+        
+        def on_generated(future):
+            with generated_lock:
+                generated.append(future)
+                done = len(generated)
+            if not future.cancelled() and future.exception() is None:
+                notify('generated', future.result()['section'], done)
+        
+        doc = self.create_document(report_data, output_path)
+        front_matter = []
+        self.create_front_matter(front_matter, report_data)
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(REPORT_SECTION_WORKERS, total))) as executor:
+            futures = [executor.submit(self.generate_one_section, report_data, section_name, ai_assistant)
+                       for section_name in sections]
+            for future in futures:
+                future.add_done_callback(on_generated)
+            results = []
+            
+            def next_section():
+                # Called by doc.build whenever it has drawn everything it was given so far
+                if len(results) == total:
+                    return None
+                result = futures[len(results)].result()
+                results.append(result)
+                story = []
+                self.create_section_story(story, result['section'], result['content'], first=(len(results) == 1))
+                notify('rendered', result['section'], len(results))
+                return story
+            
+            doc.build(SectionStream(front_matter, next_section),
+                      onFirstPage=self.create_header_footer, onLaterPages=self.create_header_footer)
+        
+        report_data['section_results'] = results
+        return output_path
+
     def extract_headings(self, content):
         """Extract headings from content for table of contents"""
         headings = []
@@ -778,31 +1071,71 @@ class PDFReportGenerator:
             if section_text:
                 story.append(Paragraph(section_text, self.styles['ReportBody']))
 
-    def generate_report(self, user_request, ai_assistant):
-        """Main method to generate a PDF report"""
+    def report_output_path(self, report_data, output_dir=None, prefix=''):
+        """Timestamped PDF path in the reports folder (or output_dir), named after the report title"""
+        # Create output directory if it doesn't exist
+        output_dir = output_dir or os.path.join(os.getcwd(), 'reports')
+        os.makedirs(output_dir, exist_ok=True)
+        
+        # Generate filename based on title
+        clean_filename = report_data['filename'].replace(' ', '_').replace('/', '_').replace('\\', '_')
+        clean_filename = ''.join(c for c in clean_filename if c.isalnum() or c in ('_', '-'))
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f"{prefix}{clean_filename}_{timestamp}.pdf"
+        return os.path.join(output_dir, filename)
+
+    def build_pipeline(self, user_request, ai_assistant, report_data=None, progress=None, fresh=False):
+        """
+        Report stages: plan -> search -> sections -> render, or plan -> search -> progressive_render,
+        which writes and lays out sections together. Running the graph for one target skips the
+        stages only the other target needs.
+        """
+        def plan():
+            return report_data if report_data is not None else self.parse_report_request(user_request, ai_assistant, fresh=fresh)
+        
+        def search(plan):
+            return self.search_report_context(plan, ai_assistant)
+        
+        def sections(plan, search):
+            return self.generate_section_content(plan, ai_assistant)
+        
+        def render(plan, sections):
+            return self.create_pdf_report(plan, ai_assistant, self.report_output_path(plan))
+        
+        def progressive_render(plan, search):
+            return self.create_pdf_report_progressive(plan, ai_assistant, self.report_output_path(plan), progress)
+        
+        return (StageGraph(site_prefix='report_stage')
+                .add('plan', plan)
+                .add('search', search, requires=('plan',))
+                .add('sections', sections, requires=('plan', 'search'))
+                .add('render', render, requires=('plan', 'sections'))
+                .add('progressive_render', progressive_render, requires=('plan', 'search')))
+
+    def generate_report(self, user_request, ai_assistant, report_data=None, progress=None, progressive=REPORT_PROGRESSIVE):
+        """
+        Main method to generate a PDF report (report_data may be passed in if the request was already parsed).
+        progress(event, section, done, total) receives per-section updates in progressive mode.
+        """
         try:
-            # Parse the user's request
-            report_data = self.parse_report_request(user_request, ai_assistant)
-            
-            # Create output directory if it doesn't exist
-            output_dir = os.path.join(os.getcwd(), 'reports')
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Generate filename based on title
-            clean_filename = report_data['filename'].replace(' ', '_').replace('/', '_').replace('\\', '_')
-            clean_filename = ''.join(c for c in clean_filename if c.isalnum() or c in ('_', '-'))
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"{clean_filename}_{timestamp}.pdf"
-            output_path = os.path.join(output_dir, filename)
-            
-            # Create the PDF
-            self.create_pdf_report(report_data, ai_assistant, output_path)
-            
-            return output_path, report_data['title']
+            target = 'progressive_render' if progressive else 'render'
+            pipeline = self.build_pipeline(user_request, ai_assistant, report_data, progress)
+            results = pipeline.run([target])
+            results['plan']['stage_times'] = dict(pipeline.timings)
+            return results[target], results['plan']['title']
             
         except Exception as e:
             return None, f"Error generating report: {str(e)}"
 
+def render_report_pdf(report_data, output_path):
+    """
+    Build the PDF for a report whose sections are already in report_data['section_results'].
+    Needs no model access, so it can run in a worker process; returns (output_path, seconds).
+    """
+    started = time.monotonic()
+    PDFReportGenerator().create_pdf_report(report_data, None, output_path)
+    return output_path, round(time.monotonic() - started, 3)
+
 def create_sample_report():
     """Create a sample report for testing"""
     from ai_assistant import SecondBrainAssistant
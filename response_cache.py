@@ -0,0 +1,360 @@
+"""
+Persistent response cache for Second Brain Assistant
+SQLite-backed LRU cache with per-entry TTL, a total byte cap and stable
+content-hash keys, so cached answers survive between runs, plus a
+semantic layer that serves answers to paraphrased questions
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import numpy as np
+from config import (
+    RESPONSE_CACHE_PATH, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL,
+    SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES
+)
+from memory_index import HashedNgramEmbedder
+
+
+def make_cache_key(namespace, *parts):
+    """Stable sha256 key for a namespace and its key parts (unlike the per-process salted hash())"""
+    payload = json.dumps([namespace, *parts], ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """LRU + TTL cache stored in its own SQLite file"""
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, max_bytes=RESPONSE_CACHE_MAX_BYTES, default_ttl=RESPONSE_CACHE_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute('PRAGMA journal_mode = WAL')
+        self._conn.execute('PRAGMA synchronous = NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_response_cache_last_access ON response_cache(last_access)')
+        self._conn.commit()
+        self._total_bytes = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM response_cache').fetchone()[0]
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def get(self, namespace, *parts):
+        """Return the cached value or None, refreshing its LRU position on a hit"""
+        key = make_cache_key(namespace, *parts)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, size, expires_at FROM response_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self._stats['misses'] += 1
+                return None
+            value, size, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute('DELETE FROM response_cache WHERE key = ?', (key,))
+                self._conn.commit()
+                self._total_bytes -= size
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._conn.execute('UPDATE response_cache SET last_access = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            self._stats['hits'] += 1
+        return json.loads(value)
+
+    def set(self, namespace, *parts, value, ttl=None):
+        """Store a JSON-serialisable value, evicting least recently used entries past the byte cap"""
+        key = make_cache_key(namespace, *parts)
+        encoded = json.dumps(value, ensure_ascii=False)
+        size = len(encoded.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl and ttl > 0 else None
+        with self._lock:
+            previous = self._conn.execute('SELECT size FROM response_cache WHERE key = ?', (key,)).fetchone()
+            self._conn.execute('''
+                INSERT OR REPLACE INTO response_cache (key, namespace, value, size, created_at, expires_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (key, namespace, encoded, size, now, expires_at, now))
+            self._total_bytes += size - (previous[0] if previous else 0)
+            self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self):
+        """Drop expired entries, then least recently used ones, until under the byte cap"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        # Other processes may share the file, so resync the running total before evicting
+        self._total_bytes = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM response_cache').fetchone()[0]
+        now = time.time()
+        expired_count, expired_bytes = self._conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache WHERE expires_at IS NOT NULL AND expires_at <= ?', (now,)
+        ).fetchone()
+        if expired_count:
+            self._conn.execute('DELETE FROM response_cache WHERE expires_at IS NOT NULL AND expires_at <= ?', (now,))
+            self._total_bytes -= expired_bytes
+            self._stats['expirations'] += expired_count
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                'SELECT key, size FROM response_cache ORDER BY last_access ASC LIMIT 50'
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                self._conn.execute('DELETE FROM response_cache WHERE key = ?', (key,))
+                self._total_bytes -= size
+                self._stats['evictions'] += 1
+
+    def stats(self):
+        """Return hit/miss/eviction counters plus the current size of the cache"""
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM response_cache').fetchone()[0]
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': self._stats['hits'] / lookups if lookups else 0.0,
+                'entries': entries,
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes
+            }
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            self._conn.execute('DELETE FROM response_cache')
+            self._conn.commit()
+            self._total_bytes = 0
+
+    def close(self):
+        """Close the cache database"""
+        with self._lock:
+            self._conn.close()
+
+
+# Filler phrases that do not change what is being asked
+_QUERY_FILLERS = [
+    'can you', 'could you', 'would you', 'please', 'tell me about', 'tell me', 'explain', 'describe',
+    'define', 'what is', 'what are', 'what does', 'give me', 'i want to know', 'do you know what', 'do you know',
+    'meaning of'
+]
+_CONTRACTIONS = {"what's": "what is", "who's": "who is", "how's": "how is", "where's": "where is", "whats": "what is"}
+# Follow-ups that refer back to the conversation cannot be answered from another context
+_ANAPHORA = {'it', 'that', 'this', 'they', 'them', 'he', 'she', 'him', 'her', 'those', 'these', 'again', 'more'}
+# Sentence punctuation carries no meaning here; every other symbol (+, *, #, /, ...) is kept as a token
+_SENTENCE_PUNCTUATION = set('?!.,;:\'"`')
+# Words that do not change what is being asked once the query is reduced to its content tokens.
+# Pronouns (my/your) and question words (how/why) are deliberately not here: they change the question
+_STOPWORDS = {
+    'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'do', 'does', 'did',
+    'of', 'in', 'on', 'for', 'about', 'some', 'any', 'can', 'could', 'would',
+    'should', 'please', 'tell', 'give', 'explain', 'describe', 'define', 'meaning', 'know', 'want',
+}
+# Answers to these change from day to day, so they are never served from the semantic cache
+_TIME_SENSITIVE = {
+    'today', 'tonight', 'tomorrow', 'yesterday', 'now', 'current', 'currently', 'latest', 'recent', 'recently',
+    'date', 'time', 'day', 'news', 'weather',
+}
+# If either query contains one of these, word order changes the question ("python faster than java")
+_ORDER_MARKERS = {
+    'than', 'vs', 'versus', 'to', 'from', 'into', 'before', 'after', 'over', 'under', 'above', 'below',
+    'minus', 'divided', 'by', 'per', 'times', 'not', 'without',
+}
+
+
+def normalize_query(query):
+    """Lowercase, expand contractions and strip filler so paraphrases normalise to the same text; symbols are kept"""
+    text = query.lower().strip()
+    for contraction, expanded in _CONTRACTIONS.items():
+        text = re.sub(rf"\b{re.escape(contraction)}\b", expanded, text)
+    tokens = [token for token in re.findall(r"\d+(?:\.\d+)*|\w+|[^\w\s]", text) if token not in _SENTENCE_PUNCTUATION]
+    text = f" {' '.join(tokens)} "
+    for filler in _QUERY_FILLERS:
+        text = text.replace(f" {filler} ", ' ')
+    return ' '.join(word for word in text.split() if word not in ('a', 'an', 'the'))
+
+
+def content_tokens(normalized):
+    """Tokens of a normalized query that decide what it asks: words, numbers and symbols minus stopwords"""
+    return [token for token in normalized.split() if token not in _STOPWORDS]
+
+
+def same_question(normalized, other):
+    """
+    Exact guard applied on top of embedding similarity: two normalized queries only share an answer
+    when their content tokens (including every number and symbol) are the same, and in the same
+    order when the order can change the meaning
+    """
+    tokens, other_tokens = content_tokens(normalized), content_tokens(other)
+    if not tokens or set(tokens) != set(other_tokens):
+        return False
+    if _ORDER_MARKERS & set(tokens) or any(not re.match(r'\w', token) for token in tokens):
+        return tokens == other_tokens
+    return True
+
+
+class SemanticResponseCache:
+    """Near-duplicate cache: serves a stored answer when a new query embeds close to a cached one"""
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, threshold=SEMANTIC_CACHE_THRESHOLD,
+                 max_entries=SEMANTIC_CACHE_MAX_ENTRIES, ttl=RESPONSE_CACHE_TTL):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embedder = HashedNgramEmbedder()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute('PRAGMA journal_mode = WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS semantic_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                normalized TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+        # Every lookup's best score is logged so the threshold can be tuned from real traffic
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS semantic_cache_scores (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp REAL NOT NULL,
+                query TEXT NOT NULL,
+                matched_query TEXT,
+                score REAL,
+                threshold REAL NOT NULL,
+                served INTEGER NOT NULL
+            )
+        ''')
+        self._conn.execute('DELETE FROM semantic_cache WHERE created_at <= ?', (time.time() - ttl,))
+        self._conn.commit()
+        self._stats = {'lookups': 0, 'hits': 0, 'skipped': 0}
+        self._load()
+
+    def _load(self):
+        rows = self._conn.execute(
+            'SELECT id, normalized, fingerprint, embedding, response, created_at FROM semantic_cache ORDER BY id'
+        ).fetchall()
+        self._ids = [row[0] for row in rows]
+        self._normalized = [row[1] for row in rows]
+        self._fingerprints = np.array([row[2] for row in rows], dtype=object)
+        self._responses = [row[4] for row in rows]
+        self._created = [row[5] for row in rows]
+        dim = self.embedder.dim
+        self._vectors = (np.frombuffer(b''.join(row[3] for row in rows), dtype=np.float32).reshape(-1, dim)
+                         if rows else np.zeros((0, dim), dtype=np.float32))
+
+    def is_cacheable(self, query):
+        """Only self-contained queries with real content are eligible"""
+        normalized = normalize_query(query)
+        words = normalized.split()
+        return (bool(content_tokens(normalized)) and not any(word in _ANAPHORA for word in words)
+                and not any(word in _TIME_SENSITIVE for word in words))
+
+    def lookup(self, query, fingerprint):
+        """
+        Return (response, score) for the closest cached query with the same fingerprint that scores at
+        least the threshold and passes same_question(), or (None, best score)
+        """
+        if not self.is_cacheable(query):
+            self._stats['skipped'] += 1
+            return None, None
+        normalized = normalize_query(query)
+        vector = self.embedder.embed(' '.join(content_tokens(normalized)))
+        now = time.time()
+        with self._lock:
+            self._stats['lookups'] += 1
+            best_score, best_index = None, None
+            served = False
+            if len(self._ids):
+                scores = self._vectors @ vector
+                valid = (self._fingerprints == fingerprint) & (np.array(self._created) > now - self.ttl)
+                if valid.any():
+                    scores = np.where(valid, scores, -1.0)
+                    best_index = int(np.argmax(scores))
+                    best_score = float(scores[best_index])
+                    # Similar-looking candidates above the threshold still have to ask the same question
+                    for index in np.argsort(-scores):
+                        if scores[index] < self.threshold:
+                            break
+                        if same_question(normalized, self._normalized[index]):
+                            best_index, best_score, served = int(index), float(scores[index]), True
+                            break
+            self._conn.execute('''
+                INSERT INTO semantic_cache_scores (timestamp, query, matched_query, score, threshold, served)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (now, normalized, self._normalized[best_index] if best_index is not None else None,
+                  best_score, self.threshold, int(served)))
+            self._conn.commit()
+            if served:
+                self._stats['hits'] += 1
+                return self._responses[best_index], best_score
+        return None, best_score
+
+    def store(self, query, fingerprint, response):
+        """Remember the answer to a query, dropping the oldest entries past max_entries"""
+        if not self.is_cacheable(query):
+            return
+        normalized = normalize_query(query)
+        vector = self.embedder.embed(' '.join(content_tokens(normalized)))
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute('''
+                INSERT INTO semantic_cache (normalized, fingerprint, embedding, response, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (normalized, fingerprint, vector.tobytes(), response, now))
+            overflow = len(self._ids) + 1 - self.max_entries
+            if overflow > 0:
+                self._conn.execute('DELETE FROM semantic_cache WHERE id IN (SELECT id FROM semantic_cache ORDER BY id LIMIT ?)', (overflow,))
+                self._conn.execute('''
+                    DELETE FROM semantic_cache_scores
+                    WHERE id NOT IN (SELECT id FROM semantic_cache_scores ORDER BY id DESC LIMIT ?)
+                ''', (self.max_entries * 10,))
+            self._conn.commit()
+            if overflow > 0:
+                self._load()
+            else:
+                self._ids.append(cursor.lastrowid)
+                self._normalized.append(normalized)
+                self._fingerprints = np.append(self._fingerprints, np.array([fingerprint], dtype=object))
+                self._responses.append(response)
+                self._created.append(now)
+                self._vectors = np.vstack([self._vectors, vector[None, :]])
+
+    def score_history(self, limit=100):
+        """Recent lookup scores as (query, matched_query, score, served), newest first"""
+        with self._lock:
+            return self._conn.execute('''
+                SELECT query, matched_query, score, served
+                FROM semantic_cache_scores
+                ORDER BY id DESC
+                LIMIT ?
+            ''', (limit,)).fetchall()
+
+    def stats(self):
+        """Return lookup/hit counters and the current threshold"""
+        with self._lock:
+            return {**self._stats, 'entries': len(self._ids), 'threshold': self.threshold}
+
+    def close(self):
+        """Close the cache database"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,93 @@
+"""
+Request coalescing for Second Brain Assistant
+Concurrent callers asking for the same thing (same prompt, same search key)
+share one in-flight call instead of each paying for their own
+"""
+
+import threading
+from concurrent.futures import Future, InvalidStateError
+
+
+class SingleFlight:
+    """Tracks in-flight work by key so duplicate concurrent requests wait on one shared future"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> [shared future, waiting caller count]
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _forget(self, key, shared):
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is not None and entry[0] is shared:
+                del self._inflight[key]
+
+    def _join(self, key, start):
+        """Return (shared future, is_leader), calling start() only when nothing is in flight for key"""
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is not None and not entry[0].done():
+                entry[1] += 1
+                self.coalesced += 1
+                return entry[0], False
+            shared = start()
+            self._inflight[key] = [shared, 1]
+            self.leaders += 1
+        shared.add_done_callback(lambda f: self._forget(key, f))
+        return shared, True
+
+    def submit(self, key, start):
+        """
+        Return a future for the call identified by key. start() must begin the work and return a
+        concurrent.futures.Future; it is only called when no identical call is in flight.
+        Each caller gets its own future (with .coalesced set when it joined an existing call), so
+        cancelling it only abandons that caller's wait; the shared call is cancelled once every
+        waiting caller has cancelled.
+        """
+        shared, leader = self._join(key, start)
+        caller = Future()
+        caller.coalesced = not leader
+
+        def relay(done):
+            try:
+                if done.cancelled():
+                    caller.cancel()
+                elif done.exception() is not None:
+                    caller.set_exception(done.exception())
+                else:
+                    caller.set_result(done.result())
+            except InvalidStateError:
+                pass  # The caller already cancelled its own wait
+
+        def release(done):
+            if not done.cancelled():
+                return
+            with self._lock:
+                entry = self._inflight.get(key)
+                if entry is None or entry[0] is not shared:
+                    return
+                entry[1] -= 1
+                abandoned = entry[1] <= 0
+            if abandoned:
+                shared.cancel()
+
+        caller.add_done_callback(release)
+        shared.add_done_callback(relay)
+        return caller
+
+    def do(self, key, fn):
+        """Run fn() once for all concurrent callers with the same key and return its result to each"""
+        placeholder = Future()
+        shared, leader = self._join(key, lambda: placeholder)
+        if leader:
+            try:
+                placeholder.set_result(fn())
+            except BaseException as e:
+                placeholder.set_exception(e)
+        return shared.result()
+
+    def stats(self):
+        """Calls actually made vs. calls that piggybacked on one already in flight"""
+        with self._lock:
+            return {'leaders': self.leaders, 'coalesced': self.coalesced, 'in_flight': len(self._inflight)}
@@ -0,0 +1,74 @@
+"""
+Stage graph for Second Brain Assistant pipelines
+Stages are named functions that declare which other stages they need.
+Running the graph for a set of targets executes only the stages those
+targets depend on, starts each one as soon as its inputs are ready, and
+records every stage's wall time in the call metrics.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from metrics import metrics
+
+
+class StageGraph:
+    """Dependency-ordered stages; a stage is called with the results of the stages it requires as keyword arguments"""
+
+    def __init__(self, site_prefix='stage', max_workers=4):
+        self.site_prefix = site_prefix
+        self.max_workers = max_workers
+        self.stages = {}  # name -> (fn, requires)
+        self.timings = {}
+        self.skipped = []
+
+    def add(self, name, fn, requires=()):
+        self.stages[name] = (fn, tuple(requires))
+        return self
+
+    def needed(self, targets):
+        """Names of the stages the targets depend on (including the targets themselves)"""
+        needed = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name in needed:
+                continue
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}'")
+            needed.add(name)
+            pending.extend(self.stages[name][1])
+        return needed
+
+    def _timed(self, name, fn, inputs):
+        started = time.monotonic()
+        error = None
+        try:
+            return fn(**inputs)
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.timings[name] = round(time.monotonic() - started, 3)
+            metrics.record_call(f"{self.site_prefix}.{name}", self.timings[name], error=error)
+
+    def run(self, targets):
+        """Run every stage the targets need and return {stage name: result}; the first stage error is re-raised"""
+        needed = self.needed(targets)
+        self.skipped = sorted(set(self.stages) - needed)
+        results = {}
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while len(results) < len(needed):
+                for name in sorted(needed - set(results) - set(running.values())):
+                    fn, requires = self.stages[name]
+                    if all(dep in results for dep in requires):
+                        inputs = {dep: results[dep] for dep in requires}
+                        running[executor.submit(self._timed, name, fn, inputs)] = name
+                if not running:
+                    raise ValueError(f"Stages have circular requirements: {sorted(needed - set(results))}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    # Stages already started are allowed to finish; nothing new starts after a failure
+                    results[name] = future.result()
+        return results
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Multi-process database stress test for Second Brain Assistant
+Starts several processes that share one SQLite file, each writing
+conversations (through the write-behind queue) and memories (directly)
+while reading, then checks that no operation failed with "database is
+locked" and that every row written is present. It also checks that the
+file is in WAL mode and that a reader in one process is not blocked by a
+write transaction held open in another.
+
+    python stress_db.py --processes 6 --operations 300
+"""
+
+import argparse
+import multiprocessing
+import os
+import queue
+import sqlite3
+import sys
+import tempfile
+import time
+
+
+def worker(db_path, worker_id, operations, memory_every, results):
+    """Write and read from one process; reports (worker_id, locked errors, other errors)"""
+    os.environ["DATABASE_PATH"] = db_path
+    # Pruning would remove rows on purpose, so keep every row for the lost-row check
+    os.environ["MAX_CONVERSATION_HISTORY"] = str(10 ** 9)
+    os.environ["MAX_MEMORY_ENTRIES"] = str(10 ** 9)
+    locked = 0
+    errors = []
+    from database import SecondBrainDB
+
+    db = SecondBrainDB()
+    try:
+        for i in range(operations):
+            try:
+                db.write_queue.put_conversation(f"worker {worker_id} message {i}", f"reply {i}")
+                if i % memory_every == 0:
+                    db.save_memory(f"worker {worker_id} memory {i}", "stress", 1 + i % 5)
+                if i % 10 == 0:
+                    db.search_memories(f"worker {worker_id}")
+                    db.get_recent_conversations(5)
+                if i % 50 == 49:
+                    db.flush_writes()
+            except sqlite3.OperationalError as e:
+                if 'locked' in str(e) or 'busy' in str(e):
+                    locked += 1
+                else:
+                    errors.append(f"{type(e).__name__}: {str(e)}")
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {str(e)}")
+        try:
+            db.flush_writes()
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {str(e)}")
+    finally:
+        db.close()
+    results.put((worker_id, locked, errors))
+
+
+def held_writer(db_path, locked, release):
+    """Hold an exclusive write transaction with an uncommitted insert until release is set"""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        # EXCLUSIVE, like a writer in the middle of committing: it locks readers out unless the file is in WAL mode
+        conn.execute('BEGIN EXCLUSIVE')
+        conn.execute(
+            "INSERT INTO conversations (timestamp, user_message, assistant_response) VALUES ('now', 'held', 'held')"
+        )
+        locked.set()
+        release.wait(60)
+        conn.execute('ROLLBACK')
+    finally:
+        conn.close()
+
+
+def timed_reader(db_path, ready, writer_locked, results):
+    """Once the writer holds its transaction, time the app's read queries; reports (seconds, error)"""
+    os.environ["DATABASE_PATH"] = db_path
+    from database import SecondBrainDB
+
+    db = SecondBrainDB()
+    try:
+        ready.set()
+        writer_locked.wait(60)
+        started = time.monotonic()
+        try:
+            # Read-only queries: search_memories also records memory access, which is a write
+            db.get_recent_conversations(5)
+            db.get_conversation_summary()
+            db.get_user_profile()
+            results.put((time.monotonic() - started, None))
+        except Exception as e:
+            results.put((time.monotonic() - started, f"{type(e).__name__}: {str(e)}"))
+    finally:
+        db.close()
+
+
+def check_reader_not_blocked(db_path):
+    """Time reads from one process while another holds a write transaction; returns (seconds, error)"""
+    # Imported here, not at the top: workers must set DATABASE_PATH before config is first imported
+    from config import DB_BUSY_TIMEOUT_MS
+    context = multiprocessing.get_context("spawn")
+    ready, locked, release = context.Event(), context.Event(), context.Event()
+    results = context.Queue()
+    reader = context.Process(target=timed_reader, args=(db_path, ready, locked, results))
+    writer = context.Process(target=held_writer, args=(db_path, locked, release))
+    reader.start()
+    try:
+        ready.wait(60)
+        writer.start()
+        try:
+            return results.get(timeout=DB_BUSY_TIMEOUT_MS / 1000 + 60)
+        except queue.Empty:
+            return float('inf'), f"reader process exited with code {reader.exitcode} without reporting"
+    finally:
+        release.set()
+        for process in (reader, writer):
+            if process.pid is not None:
+                process.join()
+
+
+def run(processes=4, operations=200, memory_every=5, db_path=None):
+    """Run the stress test and return a summary dict; summary['ok'] is False on lock errors, lost rows or blocked readers"""
+    if db_path is None:
+        workdir = tempfile.mkdtemp(prefix="second_brain_stress_")
+        db_path = os.path.join(workdir, "second_brain.db")
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    started = time.monotonic()
+    workers = [
+        context.Process(target=worker, args=(db_path, n, operations, memory_every, results))
+        for n in range(processes)
+    ]
+    for process in workers:
+        process.start()
+    reports = []
+    while len(reports) < len(workers):
+        try:
+            reports.append(results.get(timeout=1))
+        except queue.Empty:
+            # A crashed worker never reports; stop waiting once every process has exited
+            if not any(process.is_alive() for process in workers):
+                while len(reports) < len(workers):
+                    try:
+                        reports.append(results.get(timeout=0.5))
+                    except queue.Empty:
+                        break
+                break
+    for process in workers:
+        process.join()
+    elapsed = time.monotonic() - started
+
+    conn = sqlite3.connect(db_path)
+    conversations = conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+    memories = conn.execute("SELECT COUNT(*) FROM memory WHERE category = 'stress'").fetchone()[0]
+    journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0].lower()
+    conn.close()
+    reader_seconds, reader_error = check_reader_not_blocked(db_path)
+    # Without WAL the reader waits out the whole busy timeout (and then fails)
+    from config import DB_BUSY_TIMEOUT_MS
+    reader_limit = DB_BUSY_TIMEOUT_MS / 1000 / 5
+
+    expected_conversations = processes * operations
+    expected_memories = processes * len(range(0, operations, memory_every))
+    locked = sum(report[1] for report in reports)
+    errors = [error for report in reports for error in report[2]]
+    crashed = [process.exitcode for process in workers if process.exitcode != 0]
+    return {
+        'ok': not locked and not errors and not crashed
+              and conversations == expected_conversations and memories == expected_memories
+              and journal_mode == 'wal' and reader_error is None and reader_seconds < reader_limit,
+        'seconds': round(elapsed, 2),
+        'locked_errors': locked,
+        'errors': errors,
+        'crashed_processes': len(crashed),
+        'conversations': conversations,
+        'expected_conversations': expected_conversations,
+        'memories': memories,
+        'expected_memories': expected_memories,
+        'journal_mode': journal_mode,
+        'reader_seconds': round(reader_seconds, 3),
+        'reader_limit': reader_limit,
+        'reader_error': reader_error,
+        'db_path': db_path,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent multi-process stress test for the SQLite storage layer")
+    parser.add_argument("--processes", type=int, default=4, help="processes sharing the database")
+    parser.add_argument("--operations", type=int, default=200, help="conversations written per process")
+    parser.add_argument("--memory-every", type=int, default=5, help="also save a memory every N operations")
+    parser.add_argument("--db", default=None, help="database file to use (default: a temporary one)")
+    args = parser.parse_args()
+
+    summary = run(args.processes, args.operations, args.memory_every, args.db)
+    print(f"{args.processes} processes x {args.operations} operations in {summary['seconds']}s")
+    print(f"conversations {summary['conversations']}/{summary['expected_conversations']}  "
+          f"memories {summary['memories']}/{summary['expected_memories']}  "
+          f"locked errors {summary['locked_errors']}  other errors {len(summary['errors'])}  "
+          f"crashed processes {summary['crashed_processes']}")
+    print(f"journal mode {summary['journal_mode']}  read during a held write {summary['reader_seconds']}s "
+          f"(limit {summary['reader_limit']}s){'  ' + summary['reader_error'] if summary['reader_error'] else ''}")
+    for error in summary['errors'][:10]:
+        print(f"  {error}")
+    print("OK" if summary['ok'] else "FAILED")
+    sys.exit(0 if summary['ok'] else 1)
+
+
+if __name__ == "__main__":
+    main()
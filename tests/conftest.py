@@ -0,0 +1,17 @@
+import os
+import sys
+
+# Tests import the flat modules from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A SecondBrainDB on a temporary database file, closed after the test"""
+    import database
+    monkeypatch.setattr(database, 'DATABASE_PATH', str(tmp_path / "second_brain.db"))
+    instance = database.SecondBrainDB()
+    yield instance
+    instance.close()
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+from rate_limiter import CallScheduler, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+from singleflight import SingleFlight
+
+
+def test_singleflight_runs_identical_concurrent_calls_once():
+    flights = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(flights.do, "key", work) for _ in range(5)]
+        time.sleep(0.1)
+        release.set()
+        results = [future.result(5) for future in futures]
+
+    assert results == ["answer"] * 5
+    assert len(calls) == 1
+    assert flights.stats()['coalesced'] == 4
+
+
+def test_singleflight_does_not_share_errors_with_later_calls():
+    flights = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    for _ in range(2):
+        try:
+            flights.do("key", fail)
+        except ValueError:
+            pass
+    assert flights.do("key", lambda: "ok") == "ok"
+
+
+def test_scheduler_admits_interactive_calls_before_background_ones():
+    async def scenario():
+        scheduler = CallScheduler(max_concurrency=1, requests_per_minute=6000, tokens_per_minute=10 ** 9)
+        order = []
+        await scheduler.acquire(PRIORITY_BACKGROUND, 1)  # occupy the only slot
+
+        async def call(name, priority):
+            await scheduler.acquire(priority, 1)
+            order.append(name)
+            scheduler.release()
+
+        waiters = [asyncio.ensure_future(call("background", PRIORITY_BACKGROUND)),
+                   asyncio.ensure_future(call("interactive", PRIORITY_INTERACTIVE))]
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.gather(*waiters)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "background"]
+
+
+def test_scheduler_respects_request_rate():
+    async def scenario():
+        # Bucket of 2 requests refilling at 60 per minute (one per second)
+        scheduler = CallScheduler(max_concurrency=10, requests_per_minute=60, tokens_per_minute=10 ** 9)
+        scheduler.requests.capacity = scheduler.requests.tokens = 2
+        started = time.monotonic()
+        for _ in range(3):
+            await scheduler.acquire(PRIORITY_INTERACTIVE, 1)
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.9
+
+
+class ServiceUnavailable(Exception):
+    pass
+
+
+class FlakyStreamModel:
+    """Fails the first streamed call before any text, then streams normally"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            raise ServiceUnavailable("try again")
+        return iter([types.SimpleNamespace(text="hello "), types.SimpleNamespace(text="world")])
+
+
+def test_stream_retries_are_counted_on_the_loop_thread(monkeypatch):
+    import llm_gateway
+
+    monkeypatch.setattr(llm_gateway, 'LLM_BACKOFF_BASE', 0.01)
+    gateway = llm_gateway.LLMGateway(FlakyStreamModel(), max_retries=2)
+    try:
+        assert ''.join(gateway.stream_sync("hi", site="test")) == "hello world"
+        # The retry is recorded via the loop, so wait for it to run there
+        deadline = time.monotonic() + 2
+        while gateway.stats()['retries'] != 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert gateway.stats()['retries'] == 1
+    finally:
+        gateway.close()
@@ -0,0 +1,111 @@
+import threading
+
+import pytest
+
+from database import ConnectionPool
+
+
+def conversation_messages(db):
+    with db.get_connection() as conn:
+        return [row[0] for row in conn.execute('SELECT user_message FROM conversations ORDER BY id')]
+
+
+def test_flush_waits_for_queued_writes_in_order(db):
+    for i in range(25):
+        db.write_queue.put_conversation(f"message {i}", f"reply {i}")
+    db.write_queue.put_memory("likes green tea", "preference", 2)
+
+    assert db.flush_writes(timeout=5)
+    assert conversation_messages(db) == [f"message {i}" for i in range(25)]
+    with db.get_connection() as conn:
+        assert [tuple(row) for row in conn.execute('SELECT content, category, importance FROM memory')] == [
+            ("likes green tea", "preference", 2)
+        ]
+
+
+def test_flush_from_many_threads(db):
+    def writer(n):
+        for i in range(10):
+            db.write_queue.put_conversation(f"t{n}-{i}", "reply")
+        assert db.flush_writes(timeout=5)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    messages = conversation_messages(db)
+    assert len(messages) == 40
+    for n in range(4):
+        # Each thread's rows keep the order they were queued in
+        assert [m for m in messages if m.startswith(f"t{n}-")] == [f"t{n}-{i}" for i in range(10)]
+
+
+def test_write_batch_indexes_new_memories_under_their_own_ids(db):
+    db.save_memory("my sister is called anna")
+    now = "2026-01-01T00:00:00"
+    db.write_batch([], [
+        (now, "favourite colour is green", "preference", 1),
+        (now, "works as a nurse in leeds", "work", 3),
+        (now, "allergic to peanuts", "health", 5),
+    ])
+
+    with db.get_connection() as conn:
+        rows = conn.execute('SELECT id, content FROM memory').fetchall()
+    assert db.memory_index.ids() == {row[0] for row in rows}
+    for memory_id, content in rows:
+        assert db.memory_index.search(content, k=1)[0][0] == memory_id
+
+
+def test_close_drains_pending_writes(db):
+    db.write_queue.put_conversation("last words", "goodbye")
+    db.write_queue.close(timeout=5)
+
+    assert conversation_messages(db) == ["last words"]
+
+
+def test_nested_get_connection_reuses_the_outer_connection(db):
+    with db.get_connection() as outer:
+        with db.get_connection() as inner:
+            assert inner is outer
+    assert db.pool_stats()['in_use'] == 0
+
+
+def test_pool_checkout_times_out_when_exhausted(tmp_path):
+    import sqlite3
+    pool = ConnectionPool(lambda: sqlite3.connect(str(tmp_path / "pool.db"), check_same_thread=False),
+                          max_size=1, timeout=0.05)
+    conn = pool.checkout()
+    with pytest.raises(TimeoutError):
+        pool.checkout()
+    pool.checkin(conn)
+    assert pool.checkout() is conn
+    pool.close()
+
+
+def test_search_memories_ranks_by_importance_then_relevance(db):
+    db.save_memory("python is my favourite language", importance=1)
+    db.save_memory("learning python and python tooling", importance=1)
+    db.save_memory("python meetup every tuesday", importance=4)
+    db.save_memory("unrelated note about gardening", importance=5)
+
+    results = db.search_memories("python", limit=3)
+    assert [row[1] for row in results][0] == "python meetup every tuesday"
+    assert "unrelated note about gardening" not in [row[1] for row in results]
+    assert len(results) == 3
+
+
+def test_change_version_sees_writes_from_another_connection(db):
+    import database
+
+    version = db.change_version()
+    assert db.change_version() == version
+    # A second instance stands in for another assistant process writing to the same file
+    other = database.SecondBrainDB()
+    try:
+        other.save_memory("written elsewhere", "general", 1)
+    finally:
+        other.close()
+    assert db.change_version() != version
+    assert db.write_version == version[0]
@@ -0,0 +1,37 @@
+import pytest
+
+from intent_classifier import IntentClassifier
+
+# Held out from intent_training.json: the shipped model may defer these to the LLM, but must never be confidently wrong
+HELD_OUT_TIME_DATE = [
+    ("what day is halloween", "none"),
+    ("what date is new year's eve", "none"),
+    ("what year did the berlin wall fall", "none"),
+    ("what time does the concert start", "none"),
+    ("what day is my dentist appointment", "none"),
+    ("what time is it in tokyo", "none"),
+    ("what year was einstein born", "none"),
+    ("what month is ramadan this year", "none"),
+    ("what day is independence day", "none"),
+    ("what time do stores close on sunday", "none"),
+    ("what date is valentine's day", "none"),
+    ("do you know what day it is", "date"),
+    ("tell me what time it is", "time"),
+    ("what's the current year", "date"),
+]
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return IntentClassifier(fallback_log=None)
+
+
+@pytest.mark.parametrize("text, expected", HELD_OUT_TIME_DATE)
+def test_time_date_is_never_confidently_wrong(classifier, text, expected):
+    label, confidence, _ = classifier.classify('time_date', text)
+    assert label == expected or confidence < classifier.threshold
+
+
+def test_holiday_questions_are_not_routed_as_the_current_date(classifier):
+    label, confidence, _ = classifier.classify('time_date', "what day is christmas")
+    assert not (label == 'date' and confidence >= classifier.threshold)
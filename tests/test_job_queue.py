@@ -0,0 +1,169 @@
+import threading
+import time
+
+import pytest
+
+from job_queue import JobQueue
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def conversation_count(db):
+    with db.get_connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM conversations').fetchone()[0]
+
+
+def save_conversation_handler(db):
+    def handler(user_message, assistant_response, timestamp=None):
+        db.write_queue.put_conversation(user_message, assistant_response, timestamp=timestamp)
+    return handler
+
+
+def test_flush_raises_for_the_thread_whose_rows_were_lost(db, monkeypatch):
+    def broken_write_batch(conversations, memories, jobs=(), acks=()):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(db, 'write_batch', broken_write_batch)
+    db.write_queue.put_conversation("hello", "hi")
+    with pytest.raises(RuntimeError, match="disk full"):
+        db.flush_writes(timeout=5)
+    # The error is reported once; later flushes with nothing lost succeed
+    assert db.flush_writes(timeout=5)
+
+
+def test_failed_write_is_retried_instead_of_acknowledged(db, monkeypatch):
+    real_write_batch = db.write_batch
+    failures = []
+
+    def flaky_write_batch(conversations, memories, jobs=(), acks=()):
+        # Fail the batch that stores the handler's row together with the job's acknowledgement
+        if conversations and not failures:
+            failures.append(1)
+            raise RuntimeError("database is locked")
+        return real_write_batch(conversations, memories, jobs, acks)
+
+    monkeypatch.setattr(db, 'write_batch', flaky_write_batch)
+    jobs = JobQueue(db, {'save_conversation': save_conversation_handler(db)}, workers=1, retry_base=0.01, poll_interval=0.05)
+    try:
+        jobs.enqueue('save_conversation', {'user_message': "hello", 'assistant_response': "hi",
+                                           'timestamp': "2020-01-01T00:00:00"})
+        assert wait_for(lambda: jobs.stats().get('completed') == 1)
+    finally:
+        jobs.close(drain_timeout=1)
+
+    assert jobs.stats()['retried'] == 1
+    # The retried save keeps the time the turn happened, not the time the retry ran
+    with db.get_connection() as conn:
+        assert conn.execute('SELECT timestamp FROM conversations').fetchone()[0] == "2020-01-01T00:00:00"
+
+
+def test_jobs_run_and_are_deleted(db):
+    jobs = JobQueue(db, {'save_conversation': save_conversation_handler(db)}, workers=2, poll_interval=0.05)
+    try:
+        for i in range(10):
+            jobs.enqueue('save_conversation', {'user_message': f"m{i}", 'assistant_response': "r"})
+        assert wait_for(lambda: jobs.pending() == 0)
+    finally:
+        jobs.close(drain_timeout=1)
+
+    assert conversation_count(db) == 10
+
+
+def test_jobs_are_stored_and_acknowledged_in_write_behind_batches(db, monkeypatch):
+    batches = []
+    real_write_batch = db.write_batch
+
+    def counting_write_batch(conversations, memories, jobs=(), acks=()):
+        batches.append((len(conversations), len(jobs), len(acks)))
+        return real_write_batch(conversations, memories, jobs, acks)
+
+    callers = set()
+    real_get_connection = db.get_connection
+
+    def recording_get_connection():
+        callers.add(threading.get_ident())
+        return real_get_connection()
+
+    monkeypatch.setattr(db, 'write_batch', counting_write_batch)
+    jobs = JobQueue(db, {'save_conversation': save_conversation_handler(db)}, workers=2, poll_interval=0.05)
+    try:
+        monkeypatch.setattr(db, 'get_connection', recording_get_connection)
+        for i in range(10):
+            jobs.enqueue('save_conversation', {'user_message': f"m{i}", 'assistant_response': "r"})
+        # The chat thread only queues the jobs; the writer thread stores them
+        assert threading.get_ident() not in callers
+        monkeypatch.setattr(db, 'get_connection', real_get_connection)
+        assert wait_for(lambda: jobs.stats().get('completed') == 10)
+    finally:
+        jobs.close(drain_timeout=1)
+
+    assert sum(batch[1] for batch in batches) == 10 and sum(batch[2] for batch in batches) == 10
+    # Ten jobs and their rows share a few transactions instead of several commits each
+    assert len(batches) < 10
+    assert conversation_count(db) == 10
+
+
+def test_job_fails_permanently_after_max_attempts(db):
+    def always_fails():
+        raise ValueError("bad payload")
+
+    jobs = JobQueue(db, {'broken': always_fails}, workers=1, max_attempts=3, retry_base=0.01, poll_interval=0.05)
+    try:
+        jobs.enqueue('broken', {})
+        assert wait_for(lambda: jobs.stats().get('failed') == 1)
+    finally:
+        jobs.close(drain_timeout=1)
+
+    assert jobs.stats()['backlog'] == {'failed': 1}
+
+
+def test_live_lease_is_not_taken_over_by_another_process(db):
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+
+    first = JobQueue(db, {'slow': slow}, workers=1, poll_interval=0.05)
+    try:
+        first.enqueue('slow', {})
+        assert started.wait(5)
+        # A second process starting up must neither requeue nor run the leased job
+        second = JobQueue(db, {'slow': slow}, workers=1, poll_interval=0.05)
+        try:
+            assert second._claim() is None
+            with db.get_connection() as conn:
+                status, owner = conn.execute('SELECT status, owner FROM jobs').fetchone()
+            assert (status, owner) == ('running', first.owner)
+        finally:
+            second.close(drain_timeout=0.2)
+        release.set()
+        assert wait_for(lambda: first.stats().get('completed') == 1)
+    finally:
+        release.set()
+        first.close(drain_timeout=1)
+    assert second.stats().get('completed') is None
+
+
+def test_expired_lease_is_reclaimed(db):
+    ran = []
+    jobs = JobQueue(db, {'noop': lambda: ran.append(1)}, workers=1, poll_interval=0.05)
+    try:
+        # A job left running by a process that died: its lease has run out
+        with db.get_connection() as conn:
+            conn.execute('''
+                INSERT INTO jobs (kind, payload, status, attempts, available_at, created_at, owner, lease_expires)
+                VALUES ('noop', '{}', 'running', 0, 0, 'then', 'gone:1:dead', ?)
+            ''', (time.time() - 1,))
+        assert wait_for(lambda: jobs.stats().get('completed') == 1)
+    finally:
+        jobs.close(drain_timeout=1)
+    assert ran == [1]
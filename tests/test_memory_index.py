@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+
+from memory_index import MemoryIndex
+
+
+def test_save_writes_vectors_and_ids_to_one_file(tmp_path):
+    index = MemoryIndex(str(tmp_path / "brain.db"), dim=32)
+    index.add_many([(1, "hello world"), (2, "cats are great"), (5, "python code")])
+    index.save()
+
+    assert os.listdir(tmp_path) == ["brain.memindex.npz"]
+    reloaded = MemoryIndex(str(tmp_path / "brain.db"), dim=32)
+    assert reloaded.ids() == {1, 2, 5}
+    assert reloaded.search("cats are great", k=1)[0][0] == 2
+
+
+def test_save_is_skipped_when_nothing_changed(tmp_path):
+    index = MemoryIndex(str(tmp_path / "brain.db"), dim=32)
+    index.add(1, "hello world")
+    index.save()
+    path = tmp_path / "brain.memindex.npz"
+    mtime = path.stat().st_mtime_ns
+
+    # Another process's index must not be overwritten by one that only loaded it
+    MemoryIndex(str(tmp_path / "brain.db"), dim=32).save()
+    assert path.stat().st_mtime_ns == mtime
+
+
+def test_inconsistent_file_is_ignored(tmp_path):
+    path = tmp_path / "brain.memindex.npz"
+    with open(path, "wb") as f:
+        np.savez(f, vectors=np.zeros((3, 32), dtype=np.float32), ids=np.array([1, 1, 2]))
+
+    assert len(MemoryIndex(str(tmp_path / "brain.db"), dim=32)) == 0
+
+
+def test_remove_swaps_last_row_into_hole(tmp_path):
+    index = MemoryIndex(str(tmp_path / "brain.db"), dim=32)
+    index.add_many([(1, "alpha beta"), (2, "gamma delta"), (3, "epsilon zeta")])
+    index.remove(1)
+
+    assert index.ids() == {2, 3}
+    assert index.search("epsilon zeta", k=1)[0][0] == 3
@@ -0,0 +1,55 @@
+import types
+
+from report_generator import PDFReportGenerator, split_report_command
+
+
+def make_plan(sections, custom_sections=()):
+    return {
+        'content': "solar power", 'title': "Solar Power", 'sections': list(sections),
+        'custom_sections': list(custom_sections), 'user_specified_sections': bool(custom_sections),
+        'preview': "A report on solar power.", 'search_queries': ["solar power"],
+    }
+
+
+def test_requested_sections_survive_the_section_limit():
+    planned = [f"Planned {i}" for i in range(10)] + ["Costs", "Policy"]
+    report = PDFReportGenerator().validate_report_plan(make_plan(planned, ["costs", "Policy"]), "solar power")
+    sections = report['sections']
+    assert sections[0] == 'Introduction' and sections[-1] == 'Conclusion'
+    assert len(sections) == 10
+    # Requested sections come first, in the plan's wording when it has them
+    assert sections[1:3] == ["Costs", "Policy"]
+
+
+def test_requested_section_missing_from_plan_is_added():
+    report = PDFReportGenerator().validate_report_plan(make_plan(["Background", "History"], ["Storage"]), "solar power")
+    assert report['sections'] == ['Introduction', 'Storage', 'Background', 'History', 'Conclusion']
+
+
+def test_plan_with_too_many_requested_sections_is_rejected():
+    requested = [f"Topic {i}" for i in range(9)]
+    assert PDFReportGenerator().validate_report_plan(make_plan(requested, requested), "solar power") is None
+
+
+def test_plan_without_requested_sections_keeps_planned_order():
+    planned = ['Introduction'] + [f"Planned {i}" for i in range(10)] + ['Conclusion']
+    report = PDFReportGenerator().validate_report_plan(make_plan(planned), "solar power")
+    assert report['sections'][1:-1] == [f"Planned {i}" for i in range(8)]
+
+
+def test_fresh_flag_is_case_insensitive_and_can_be_passed_in():
+    generator = PDFReportGenerator()
+    assistant = types.SimpleNamespace()
+    generator.plan_report = lambda request, ai_assistant: None
+    generator.parse_report_request_stepwise = lambda request, report_data, ai_assistant: report_data
+
+    report = generator.parse_report_request("/report --FRESH solar power", assistant)
+    assert report['fresh'] and report['content'] == "solar power"
+    assert generator.parse_report_request("/report solar power", assistant, fresh=True)['fresh']
+    assert not generator.parse_report_request("/report solar power", assistant)['fresh']
+
+
+def test_report_command_without_a_topic_is_empty():
+    assert split_report_command("/report") == ("", False)
+    assert split_report_command("/report --fresh") == ("", True)
+    assert split_report_command("/REPORT --Fresh solar power") == ("solar power", True)
@@ -0,0 +1,40 @@
+import types
+
+import report_generator
+from report_generator import PDFReportGenerator, normalize_topic
+
+
+def search_returning(results):
+    def fake_search(topic, llm, num_results=3):
+        return results
+    return fake_search
+
+
+def cache_parts_for(monkeypatch, results):
+    monkeypatch.setattr(report_generator, 'advanced_web_search', search_returning(results))
+    generator = PDFReportGenerator()
+    report_data = {'content': "solar power", 'search_queries': ["solar power"]}
+    generator.search_report_context(report_data, types.SimpleNamespace(llm=None))
+    return generator.section_cache_parts(report_data, "Background")
+
+
+def test_section_cache_key_ignores_rewritten_snippets(monkeypatch):
+    first = [{'title': "Solar", 'link': "https://a.example", 'enriched_snippet': "Panels got cheaper."},
+             {'title': "Grid", 'link': "https://b.example", 'enriched_snippet': "Storage matters."}]
+    # Same results in a different order, with the model's summaries worded differently
+    second = [{'title': "Grid", 'link': "https://b.example", 'enriched_snippet': "Batteries are key."},
+              {'title': "Solar", 'link': "https://a.example", 'enriched_snippet': "Costs fell sharply."}]
+    assert cache_parts_for(monkeypatch, first) == cache_parts_for(monkeypatch, second)
+
+
+def test_section_cache_key_changes_with_sources(monkeypatch):
+    first = [{'title': "Solar", 'link': "https://a.example", 'snippet': "Panels got cheaper."}]
+    second = [{'title': "Solar", 'link': "https://c.example", 'snippet': "Panels got cheaper."}]
+    assert cache_parts_for(monkeypatch, first) != cache_parts_for(monkeypatch, second)
+
+
+def test_normalize_topic_keeps_word_order_and_repeats():
+    assert normalize_topic("A report on Climate Change!") == normalize_topic("climate change")
+    assert normalize_topic("india exports to china") != normalize_topic("china exports to india")
+    assert normalize_topic("history of rome in britain") != normalize_topic("history of britain in rome")
+    assert normalize_topic("bye bye birdie") != normalize_topic("bye birdie")
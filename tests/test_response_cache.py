@@ -0,0 +1,112 @@
+import time
+
+import pytest
+
+from config import SEMANTIC_CACHE_THRESHOLD
+from response_cache import ResponseCache, SemanticResponseCache, normalize_query, same_question
+
+# Labeled pairs used to choose SEMANTIC_CACHE_THRESHOLD: the first group must share an answer, the second must not
+PARAPHRASES = [
+    ("what's recursion", "explain recursion"),
+    ("what is recursion?", "define recursion"),
+    ("can you explain recursion please", "recursion"),
+    ("tell me about the eiffel tower", "what is the eiffel tower"),
+    ("tips for better sleep", "better sleep tips"),
+    ("what is photosynthesis", "Explain photosynthesis."),
+    ("describe the water cycle", "what is the water cycle?"),
+    ("what are black holes", "tell me about black holes"),
+    ("What is the capital of Japan?", "capital of japan"),
+    ("define machine learning", "what's machine learning"),
+    ("give me tips for studying", "tips for studying"),
+    ("what is 5*3", "what is 5 * 3"),
+    ("what is C++", "explain C++"),
+    ("python list vs tuple", "Python list vs tuple?"),
+    ("benefits of meditation", "what are the benefits of meditation"),
+    ("do you know what inflation is", "what is inflation"),
+]
+NON_PARAPHRASES = [
+    ("what is 5*3", "what is 5+3"),
+    ("what is C++", "what is C"),
+    ("is python faster than java", "is java faster than python"),
+    ("world cup 2018", "world cup 2022"),
+    ("install numpy", "uninstall numpy"),
+    ("convert celsius to fahrenheit", "convert fahrenheit to celsius"),
+    ("capital of japan", "capital of china"),
+    ("python list vs tuple", "python tuple vs list"),
+    ("what is 10/2", "what is 2/10"),
+    ("population of india in 2020", "population of india in 2023"),
+    ("how to learn python", "how to learn python fast"),
+    ("hello there (#0)", "hello there (#1)"),
+    ("iphone 14 price", "iphone 15 price"),
+    ("what is recursion", "what is recursion in python"),
+    ("sort a list ascending", "sort a list descending"),
+    ("windows 10 vs 11", "windows 11 vs 10"),
+    ("what is my name", "what is your name"),
+    ("what do i like", "what do you like"),
+    ("what is your favorite color", "what is my favorite color"),
+    ("how is the sky blue", "why is the sky blue"),
+    ("what can you eat", "what should i eat"),
+]
+
+
+@pytest.fixture
+def semantic_cache(tmp_path):
+    cache = SemanticResponseCache(path=str(tmp_path / "cache.db"))
+    yield cache
+    cache.close()
+
+
+@pytest.mark.parametrize("cached, asked", PARAPHRASES)
+def test_paraphrases_are_served_from_cache(semantic_cache, cached, asked):
+    semantic_cache.store(cached, "profile", "the answer")
+    response, score = semantic_cache.lookup(asked, "profile")
+    assert response == "the answer"
+    assert score >= SEMANTIC_CACHE_THRESHOLD
+
+
+@pytest.mark.parametrize("cached, asked", NON_PARAPHRASES)
+def test_different_questions_are_not_served_from_cache(semantic_cache, cached, asked):
+    semantic_cache.store(cached, "profile", "the answer")
+    assert semantic_cache.lookup(asked, "profile")[0] is None
+
+
+def test_symbols_and_numbers_survive_normalization():
+    assert normalize_query("What is 5*3?") == "5 * 3"
+    assert normalize_query("what's C++") == "c + +"
+    assert not same_question(normalize_query("what is 5*3"), normalize_query("what is 5+3"))
+
+
+def test_lookup_picks_the_candidate_that_asks_the_same_question(semantic_cache):
+    semantic_cache.store("what is 5+3", "profile", "8")
+    semantic_cache.store("what is 5*3", "profile", "15")
+    assert semantic_cache.lookup("what's 5 * 3", "profile")[0] == "15"
+
+
+def test_answers_are_not_shared_across_fingerprints(semantic_cache):
+    semantic_cache.store("explain recursion", "profile-a", "the answer")
+    assert semantic_cache.lookup("explain recursion", "profile-b")[0] is None
+
+
+def test_follow_ups_are_not_cached(semantic_cache):
+    semantic_cache.store("explain it again", "profile", "the answer")
+    assert semantic_cache.lookup("explain it again", "profile") == (None, None)
+
+
+def test_response_cache_expires_and_evicts(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "cache.db"), max_bytes=200, default_ttl=60)
+    cache.set("ns", "short", value="x", ttl=0.05)
+    time.sleep(0.1)
+    assert cache.get("ns", "short") is None
+
+    for i in range(10):
+        cache.set("ns", f"key {i}", value="y" * 40)
+    assert cache.get("ns", "key 0") is None  # least recently used entries went first
+    assert cache.get("ns", "key 9") == "y" * 40
+    assert cache.stats()['evictions'] > 0
+    cache.close()
+
+
+@pytest.mark.parametrize("query", ["what is the date today", "latest news on python", "what time is it in tokyo"])
+def test_time_sensitive_questions_are_not_cached(semantic_cache, query):
+    semantic_cache.store(query, "profile", "the answer")
+    assert semantic_cache.lookup(query, "profile")[0] is None
@@ -0,0 +1,15 @@
+import stress_db
+
+
+def test_concurrent_processes_share_the_database_without_lock_errors_or_lost_rows(tmp_path):
+    summary = stress_db.run(processes=4, operations=60, memory_every=3, db_path=str(tmp_path / "stress.db"))
+
+    assert summary['locked_errors'] == 0
+    assert summary['errors'] == []
+    assert summary['conversations'] == summary['expected_conversations']
+    assert summary['memories'] == summary['expected_memories']
+    assert summary['ok']
+    # Readers must not wait for a writer in another process
+    assert summary['journal_mode'] == 'wal'
+    assert summary['reader_error'] is None
+    assert summary['reader_seconds'] < summary['reader_limit']